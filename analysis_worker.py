@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Long-lived analysis worker for the Next.js API routes.
+
+Instead of writing a temp script and starting a fresh python3 for every
+request, the routes POST to this local HTTP server. It keeps one
+LlamaProcessor (and its pooled client) warm, and runs analyses on a bounded
+worker pool with a capped queue, so bursts are absorbed without racing on
+shared files.
+
+Endpoints:
+    GET  /health             worker status and queue depth
+    GET  /metrics            Prometheus text metrics
+    POST /analyze-job        {"jobDescription": "..."}
+    POST /general-analysis   {"analysisType": "skills|experience|education|overall"}
+
+Usage:
+    python analysis_worker.py [--host 127.0.0.1] [--port 8765] [--workers 4]
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llama_client import LlamaProcessor
+from metrics import render_prometheus
+from http_transport import get_transport
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+class WorkerBusy(Exception):
+    pass
+
+class AnalysisWorker:
+    """
+    Warm processor plus a bounded pool and queue for analysis requests
+    """
+    def __init__(self, processor=None, max_workers=4, max_queue=32, timeout=120, filename="person_data.json"):
+        self.processor = processor or LlamaProcessor()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.filename = filename
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """Run fn on the pool and wait for its result, rejecting work past the queue limit"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise WorkerBusy("Analysis queue is full, try again shortly")
+            self._pending += 1
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # A timed-out job keeps its worker busy, so it stays counted until it really ends
+        future.add_done_callback(lambda _: self._release())
+        return future.result(timeout=self.timeout)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def analyze_job(self, job_description):
+        person = self._person()
+        return self.submit(self.processor.analyze_candidate, person, job_description)
+
+    def general_analysis(self, analysis_type):
+        person = self._person()
+        return self.submit(self.processor.analyze_focus, person, analysis_type)
+
+    def status(self):
+        with self._lock:
+            pending = self._pending
+        return {"ok": True, "pending": pending, "workers": self.max_workers, "max_queue": self.max_queue}
+
+    def _person(self):
+        person = self.processor._load_person(self.filename)
+        if not person:
+            raise LookupError("No person data found")
+        return person
+
+def make_handler(worker):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, worker.status())
+            elif self.path == "/metrics":
+                data = render_prometheus(transport_metrics=get_transport().metrics()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._send(404, {"success": False, "error": "Not found"})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                self._send(400, {"success": False, "error": "Invalid JSON body"})
+                return
+
+            try:
+                if self.path == "/analyze-job":
+                    job_description = (body.get("jobDescription") or "").strip()
+                    if not job_description:
+                        self._send(400, {"success": False, "error": "Job description is required"})
+                        return
+                    analysis = worker.analyze_job(job_description)
+                elif self.path == "/general-analysis":
+                    analysis_type = body.get("analysisType")
+                    if not analysis_type:
+                        self._send(400, {"success": False, "error": "Analysis type is required"})
+                        return
+                    analysis = worker.general_analysis(analysis_type)
+                else:
+                    self._send(404, {"success": False, "error": "Not found"})
+                    return
+            except WorkerBusy as e:
+                self._send(503, {"success": False, "error": str(e)})
+                return
+            except LookupError as e:
+                self._send(404, {"success": False, "error": str(e)})
+                return
+            except TimeoutError:
+                self._send(504, {"success": False, "error": "Analysis timed out"})
+                return
+            except Exception as e:
+                self._send(500, {"success": False, "error": str(e)})
+                return
+
+            self._send(200, {"success": True, "analysis": analysis})
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            sys.stderr.write(f"🧠 {self.address_string()} {format % args}\n")
+
+    return Handler
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_workers=4, max_queue=32):
+    worker = AnalysisWorker(max_workers=max_workers, max_queue=max_queue)
+    server = ThreadingHTTPServer((host, port), make_handler(worker))
+    server.daemon_threads = True
+    print(f"🧠 Analysis worker listening on http://{host}:{port} ({max_workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down analysis worker")
+    finally:
+        server.server_close()
+        worker.executor.shutdown(wait=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent Llama analysis worker for the web frontend")
+    parser.add_argument("--host", default=os.getenv("ANALYSIS_WORKER_HOST", DEFAULT_HOST))
+    parser.add_argument("--port", type=int, default=int(os.getenv("ANALYSIS_WORKER_PORT", DEFAULT_PORT)))
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent analyses (default: 4)")
+    parser.add_argument("--max-queue", type=int, default=32, help="Requests allowed to wait before returning 503 (default: 32)")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.max_queue)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Async enrich → condense → analyze pipeline over many candidates.
+
+Each stage runs its own pool of asyncio workers and hands items to the next
+stage through a bounded queue, so CrustData fetches and Llama calls for
+different candidates overlap while a slow stage pushes back on the ones in
+front of it instead of buffering without limit. Results go to a sink as soon
+as each candidate finishes.
+
+Usage:
+    python async_pipeline.py urls.txt
+    python async_pipeline.py urls.txt --job job.txt --enrich-concurrency 8 --analyze-concurrency 4 --output results.jsonl
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from crustdata import async_request_person_data, save_person_data, load_profile_urls
+from llama_client import LlamaProcessor
+from token_budget import count_tokens
+from candidate_store import get_candidate_store, candidate_key
+
+_DONE = object()
+
+class AsyncRateLimiter:
+    """
+    Spaces out acquisitions to at most `rate` per second across all tasks
+    """
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        await asyncio.sleep(max(0.0, slot - time.monotonic()))
+
+class JsonlSink:
+    """
+    Writes each finished result as one JSON line (to a file, or stdout)
+    """
+    def __init__(self, path=None):
+        self.file = open(path, 'a', encoding='utf-8') if path else sys.stdout
+
+    def __call__(self, result):
+        self.file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+async def _run_stage(handler, inbox, outbox, concurrency, downstream_workers=1):
+    """
+    Run `concurrency` workers that take items from inbox, apply handler and put
+    the result on outbox. Items that already failed pass straight through.
+    When the stage is drained, one _DONE is sent per downstream worker.
+    """
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                break
+            if item.get("error") is None:
+                try:
+                    await handler(item)
+                except Exception as e:
+                    item["error"] = str(e)
+                    item["failed_stage"] = handler.__name__.strip("_")
+            await outbox.put(item)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    for _ in range(downstream_workers):
+        await outbox.put(_DONE)
+
+async def run_async_pipeline(linkedin_urls, job_description=None, processor=None, sink=None,
+                             enrich_concurrency=4, analyze_concurrency=4, queue_size=16,
+                             requests_per_second=None, force_refresh=False):
+    """
+    Enrich, condense and analyze every profile URL, emitting each finished
+    result to `sink` (a callable; defaults to JSON lines on stdout).
+    Returns the list of results in completion order.
+    """
+    processor = processor or LlamaProcessor()
+    sink = sink or JsonlSink()
+    limiter = AsyncRateLimiter(requests_per_second)
+
+    to_enrich = asyncio.Queue(maxsize=queue_size)
+    to_condense = asyncio.Queue(maxsize=queue_size)
+    to_analyze = asyncio.Queue(maxsize=queue_size)
+    finished = asyncio.Queue(maxsize=queue_size)
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(60, connect=10)) as client:
+
+        async def _enrich(item):
+            start = time.perf_counter()
+            await limiter.wait()
+            data = await async_request_person_data(item["url"], client, force_refresh=force_refresh)
+            if not data:
+                raise RuntimeError("CrustData returned no profile data")
+            item["data"] = data
+            item["timings"]["enrich"] = time.perf_counter() - start
+
+        async def _condense(item):
+            start = time.perf_counter()
+            data = item.pop("data")
+            # SQLite and index writes block; keep them off the event loop
+            await asyncio.to_thread(save_person_data, data, item["url"], filename=None)
+            person = data[0] if isinstance(data, list) else data
+            prompt = processor.analysis_prompt(person, job_description)
+            item.update({
+                "person": person,
+                "prompt": prompt,
+                "name": person.get('name', 'Unknown'),
+                "prompt_tokens": count_tokens(prompt),
+            })
+            item["timings"]["condense"] = time.perf_counter() - start
+
+        async def _analyze(item):
+            start = time.perf_counter()
+            person, prompt = item.pop("person"), item.pop("prompt")
+            if job_description:
+                item["analysis"] = await processor.aanalyze_candidate(person, job_description, prompt=prompt)
+            else:
+                item["analysis"] = await processor.aanalyze_person(person, prompt=prompt)
+            item["timings"]["analyze"] = time.perf_counter() - start
+            await asyncio.to_thread(
+                get_candidate_store().save_analysis,
+                candidate_key(person), "job_fit" if job_description else "general", item["analysis"], job_description,
+            )
+
+        async def produce():
+            for url in linkedin_urls:
+                await to_enrich.put({"url": url, "error": None, "timings": {}})
+            for _ in range(enrich_concurrency):
+                await to_enrich.put(_DONE)
+
+        results = []
+
+        async def drain():
+            while True:
+                item = await finished.get()
+                if item is _DONE:
+                    break
+                # Failed items may still carry their raw record and prompt
+                item.pop("person", None)
+                item.pop("prompt", None)
+                item.pop("data", None)
+                results.append(item)
+                sink(item)
+
+        await asyncio.gather(
+            produce(),
+            _run_stage(_enrich, to_enrich, to_condense, enrich_concurrency, downstream_workers=1),
+            _run_stage(_condense, to_condense, to_analyze, 1, downstream_workers=analyze_concurrency),
+            _run_stage(_analyze, to_analyze, finished, analyze_concurrency, downstream_workers=1),
+            drain(),
+        )
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Async enrich → condense → analyze pipeline")
+    parser.add_argument("urls", help="File with one LinkedIn URL per line")
+    parser.add_argument("--job", metavar="FILE", help="Job description for job fit analysis (default: general analysis)")
+    parser.add_argument("--enrich-concurrency", type=int, default=4, help="Concurrent CrustData fetches (default: 4)")
+    parser.add_argument("--analyze-concurrency", type=int, default=4, help="Concurrent Llama calls (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=16, help="Max items waiting between stages (default: 16)")
+    parser.add_argument("--rps", type=float, default=5, help="Max CrustData requests per second, 0 for no limit (default: 5)")
+    parser.add_argument("--force-refresh", action="store_true", help="Ignore the enrichment cache")
+    parser.add_argument("--output", help="Append results to this JSONL file instead of stdout")
+    args = parser.parse_args(argv)
+
+    job_description = None
+    if args.job:
+        with open(args.job, 'r', encoding='utf-8') as f:
+            job_description = f.read()
+    urls = list(dict.fromkeys(load_profile_urls(args.urls)))
+
+    sink = JsonlSink(args.output)
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(run_async_pipeline(
+            urls, job_description=job_description, sink=sink,
+            enrich_concurrency=args.enrich_concurrency, analyze_concurrency=args.analyze_concurrency,
+            queue_size=args.queue_size, requests_per_second=args.rps, force_refresh=args.force_refresh,
+        ))
+    finally:
+        sink.close()
+
+    failed = sum(1 for r in results if r["error"])
+    print(f"📊 {len(results) - failed}/{len(results)} candidates analyzed in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Offline batch analysis with checkpointing and resume.
+
+Runs a general, focus or job fit analysis over a candidate list on a worker
+pool. Every finished candidate is appended to a JSONL checkpoint file as soon
+as it completes; re-running the same command skips everything already in the
+file and picks up exactly where a killed run stopped (failed items are tried
+again unless --skip-failed is given). Progress, throughput and ETA are
+reported as results come in.
+
+Candidates can be profile JSON files/directories, a text file of LinkedIn
+URLs (looked up in the candidate store, fetched if missing), or, with
+neither, everyone in the candidate store.
+
+Usage:
+    python batch_runner.py --job job.txt --output fit.jsonl profiles/
+    python batch_runner.py --job job.txt --structured --output fit.jsonl profiles/
+    python batch_runner.py --general --output general.jsonl --urls urls.txt --workers 8
+    python batch_runner.py --focus skills --output skills.jsonl     # whole store
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from candidate_store import get_candidate_store, candidate_key, job_hash
+from ranking import load_people, parse_fit_score
+from job_fit_schema import format_job_fit
+
+class Checkpoint:
+    """
+    Append-only JSONL record of finished items, keyed by item id
+    """
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, 'rb+') as f:
+                end = 0
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = None
+                    if not line.endswith(b"\n"):
+                        # A run killed mid-write can leave one partial last line:
+                        # cut it off (or finish it) so the next record starts on its own line
+                        if record is None:
+                            f.truncate(end)
+                        else:
+                            f.write(b"\n")
+                    end += len(line)
+                    if record is not None:
+                        self.done[record["id"]] = record
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.done[record["id"]] = record
+
+    def close(self):
+        self._file.close()
+
+class Progress:
+    """
+    Completed/failed counts with throughput and ETA, printed at most every `interval` seconds
+    """
+    def __init__(self, total, skipped=0, interval=2.0, stream=sys.stderr):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.interval = interval
+        self.stream = stream
+        self.start = time.perf_counter()
+        self._last_print = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, ok):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            now = time.perf_counter()
+            if now - self._last_print >= self.interval or self.done == self.total:
+                self._last_print = now
+                print(self.format(), file=self.stream, flush=True)
+
+    def format(self):
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        remaining = self.total - self.done
+        eta = _format_duration(remaining / rate) if rate else "?"
+        line = (f"⏳ [{self.done + self.skipped}/{self.total + self.skipped}] "
+                f"{(self.done + self.skipped) / max(1, self.total + self.skipped):.0%}  "
+                f"{rate:.2f} items/s  ETA {eta}")
+        if self.failed:
+            line += f"  ({self.failed} failed)"
+        return line
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+def item_id(person, kind, job_description=None, focus=None):
+    """Checkpoint id for one candidate under one analysis spec"""
+    spec = job_hash(job_description) if kind.startswith("job_fit") else (focus or "")
+    return f"{candidate_key(person)}|{kind}|{spec}"
+
+def load_candidates_from_urls(filename, max_workers=8, requests_per_second=5):
+    """
+    Person records for a file of LinkedIn URLs. URLs not yet in the candidate
+    store are fetched first; any that still fail are reported and left out.
+    """
+    from crustdata import load_profile_urls, fetch_people_data
+
+    store = get_candidate_store()
+    urls = list(dict.fromkeys(load_profile_urls(filename)))
+    missing = [url for url in urls if store.get(url) is None]
+    if missing:
+        fetch_people_data(missing, output_dir=None, max_workers=max_workers,
+                          requests_per_second=requests_per_second)
+    people = [store.get(url) for url in urls]
+    return [person for person in people if person is not None]
+
+def _analyze(processor, person, kind, job_description, focus):
+    if kind == "job_fit_structured":
+        return processor.analyze_candidate_structured(person, job_description)
+    if kind == "job_fit":
+        return processor.analyze_candidate(person, job_description)
+    if kind == "focus":
+        return processor.analyze_focus(person, focus)
+    return processor.analyze_person(person)
+
+def run_batch(people, checkpoint_path, job_description=None, focus=None, processor=None,
+              max_workers=4, retry_failed=True, progress_interval=2.0, structured=False):
+    """
+    Analyze every person not already completed in the checkpoint file.
+    The analysis is job fit with a job description (a validated JSON result
+    with `structured`), a focus analysis with `focus`, and a general analysis
+    otherwise. Returns the Progress counters.
+    """
+    if processor is None:
+        from llama_client import LlamaProcessor
+        processor = LlamaProcessor()
+    if job_description:
+        kind = "job_fit_structured" if structured else "job_fit"
+    else:
+        kind = "focus" if focus else "general"
+    checkpoint = Checkpoint(checkpoint_path)
+    store = get_candidate_store()
+
+    pending, skipped = [], 0
+    for person in people:
+        previous = checkpoint.done.get(item_id(person, kind, job_description, focus))
+        if previous and (previous["status"] == "ok" or not retry_failed):
+            skipped += 1
+        else:
+            pending.append(person)
+    progress = Progress(len(pending), skipped=skipped, interval=progress_interval)
+    if skipped:
+        print(f"↩️ Resuming: {skipped} already done, {len(pending)} to go", file=sys.stderr)
+
+    def work(person):
+        start = time.perf_counter()
+        record = {
+            "id": item_id(person, kind, job_description, focus),
+            "key": candidate_key(person),
+            "name": person.get('name', 'Unknown'),
+            "kind": kind,
+            "focus": focus,
+            "job_hash": job_hash(job_description),
+        }
+        try:
+            # Stores the record if needed; inside the try so a busy database fails just this item
+            store.key_for(person)
+            analysis = _analyze(processor, person, kind, job_description, focus)
+            if kind == "job_fit_structured":
+                store.save_job_fit(record["key"], job_description, analysis)
+                record.update({"fit_score": analysis["fit_score"], "result": analysis})
+                analysis = format_job_fit(analysis)
+            elif kind == "job_fit":
+                record["fit_score"] = parse_fit_score(analysis)
+            if kind in ("job_fit", "general"):
+                store.save_analysis(record["key"], kind, analysis, job_description)
+            record.update({"status": "ok", "analysis": analysis, "error": None})
+        except Exception as e:
+            record.update({"status": "failed", "analysis": None, "error": str(e)})
+        record["elapsed"] = round(time.perf_counter() - start, 3)
+        record["finished_at"] = time.time()
+        checkpoint.write(record)
+        progress.update(record["status"] == "ok")
+
+    # Keep a bounded number of items in flight so huge lists don't queue up in memory
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch")
+    in_flight = set()
+    try:
+        for person in pending:
+            if len(in_flight) >= max_workers * 2:
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            in_flight.add(executor.submit(work, person))
+        wait(in_flight)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted; finishing in-flight items. Re-run the same command to resume.", file=sys.stderr)
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        checkpoint.close()
+    return progress
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-analyze candidates with checkpointing and resume")
+    parser.add_argument("profiles", nargs="*", help="Profile JSON files or directories (default: the candidate store)")
+    parser.add_argument("--urls", metavar="FILE", help="File with one LinkedIn URL per line")
+    spec = parser.add_mutually_exclusive_group(required=True)
+    spec.add_argument("--job", metavar="FILE", help="Job description for job fit analysis")
+    spec.add_argument("--general", action="store_true", help="General professional analysis")
+    spec.add_argument("--focus", choices=["skills", "experience", "education", "overall"], help="Focused analysis")
+    parser.add_argument("--structured", action="store_true", help="With --job, request validated JSON results")
+    parser.add_argument("--output", required=True, help="JSONL checkpoint/results file (appended to, resumed from)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent Llama calls (default: 4)")
+    parser.add_argument("--rps", type=float, default=5, help="Max CrustData requests per second when fetching --urls (default: 5)")
+    parser.add_argument("--skip-failed", action="store_true", help="On resume, don't retry items that failed before")
+    args = parser.parse_args(argv)
+
+    job_description = None
+    if args.job:
+        with open(args.job, 'r', encoding='utf-8') as f:
+            job_description = f.read()
+
+    try:
+        if args.profiles:
+            people = load_people(args.profiles)
+        elif args.urls:
+            people = load_candidates_from_urls(args.urls, max_workers=args.workers, requests_per_second=args.rps)
+        else:
+            people = list(get_candidate_store().iter_people())
+        if not people:
+            print("❌ No candidates found.")
+            return 1
+
+        print(f"🤖 Batch of {len(people)} candidates → {args.output} ({args.workers} workers)")
+        progress = run_batch(people, args.output, job_description=job_description, focus=args.focus,
+                             max_workers=args.workers, retry_failed=not args.skip_failed,
+                             structured=args.structured)
+    except KeyboardInterrupt:
+        return 130
+    elapsed = time.perf_counter() - progress.start
+    print(f"\n📊 {progress.done - progress.failed}/{progress.done} analyzed in {elapsed:.1f}s"
+          + (f", {progress.skipped} skipped from earlier runs" if progress.skipped else "")
+          + (f", {progress.failed} failed" if progress.failed else ""))
+    return 1 if progress.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmarks against local mock CrustData and Llama servers.
+
+Starts the stand-ins from mock_servers.py, points the app at them and runs:
+    single      sequential single-profile enrichments
+    batch       fetch_people_data over many profiles
+    ranking     rank_candidates against a job description
+    chat        multi-turn streamed Intel Chat
+    coldstart   fresh-interpreter import time of the CLI modules, checked
+                against an import-time budget (see below)
+
+Each scenario reports requests/sec, p50/p95 latency and peak RSS. Caches and
+the candidate store are pointed at a temporary directory so nothing in the
+working tree is touched and every run starts cold.
+
+coldstart also runs each module under `python -X importtime` and compares its
+cumulative import time with --import-budget-ms (default 150). The slowest
+direct imports are listed, and the exit status is 1 when a module is over
+budget, so the check can gate CI. Heavy dependencies (openai, httpx,
+requests, NumPy) are meant to load on first use, not at import.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --scenarios batch ranking --profiles 200 --latency 0.1 --error-rate 0.05
+    python benchmark.py --output bench.json
+    python benchmark.py --scenarios coldstart --import-budget-ms 100
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import statistics
+import subprocess
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from metrics import percentile
+from mock_servers import MockConfig, MockServer
+
+SCENARIOS = ("single", "batch", "ranking", "chat", "coldstart")
+
+COLDSTART_MODULES = ("crustdata", "llama_client", "simple_chat", "pipeline")
+DEFAULT_IMPORT_BUDGET_MS = 150
+
+JOB_DESCRIPTION = """Senior Backend Engineer
+Requirements: 5+ years of Python or Go, distributed systems, PostgreSQL,
+Kubernetes and AWS. Experience mentoring engineers is a plus."""
+
+CHAT_QUESTIONS = [
+    "Summarize this candidate in two sentences.",
+    "What was their most senior role?",
+    "And before that?",
+    "Which skills stand out for a backend role?",
+    "Any gaps I should ask about?",
+]
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+def _summary(name, latencies, elapsed, requests, **extra):
+    ordered = sorted(latencies)
+    return {
+        "scenario": name,
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(requests / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 1) if ordered else None,
+        "p95_ms": round(percentile(ordered, 95) * 1000, 1) if ordered else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1) if resource else None,
+        **extra,
+    }
+
+def _profile_urls(count):
+    return [f"https://www.linkedin.com/in/bench-candidate-{i}/" for i in range(count)]
+
+def bench_single(args):
+    from crustdata import request_person_data
+
+    latencies = []
+    start = time.perf_counter()
+    for url in _profile_urls(args.requests):
+        t0 = time.perf_counter()
+        request_person_data(url, force_refresh=True)
+        latencies.append(time.perf_counter() - t0)
+    return _summary("single", latencies, time.perf_counter() - start, args.requests)
+
+def bench_batch(args):
+    from crustdata import fetch_people_data
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = fetch_people_data(_profile_urls(args.profiles), output_dir=None, max_workers=args.workers,
+                                    requests_per_second=0, force_refresh=True)
+    elapsed = time.perf_counter() - start
+    # Per-request latency comes from the transport's own counters
+    from http_transport import get_transport
+    stats = get_transport().stats("crustdata.enrich")
+    return _summary("batch", list(stats.latencies)[-len(results):], elapsed, len(results),
+                    failed=sum(1 for r in results if not r["ok"]))
+
+def bench_ranking(args):
+    from crustdata import request_person_data
+    from llama_client import LlamaProcessor
+    from ranking import rank_candidates
+
+    people = [request_person_data(url)[0] for url in _profile_urls(args.profiles)]
+    processor = LlamaProcessor(cache=False)
+    start = time.perf_counter()
+    results = rank_candidates(JOB_DESCRIPTION, people, processor=processor, max_workers=args.workers)
+    elapsed = time.perf_counter() - start
+    latencies = [r["elapsed"] for r in results if r["elapsed"] is not None]
+    return _summary("ranking", latencies, elapsed, len(results),
+                    failed=sum(1 for r in results if r["error"]))
+
+def bench_chat(args):
+    from crustdata import request_person_data
+    from llama_client import LlamaProcessor
+    from chat_session import ChatSession
+
+    person = request_person_data(_profile_urls(1)[0])[0]
+    processor = LlamaProcessor(cache=False)
+    latencies, first_tokens = [], []
+    start = time.perf_counter()
+    for conversation in range(args.conversations):
+        session = ChatSession(person, processor)
+        for question in CHAT_QUESTIONS:
+            t0 = time.perf_counter()
+            "".join(session.stream(question))
+            latencies.append(time.perf_counter() - t0)
+            first_tokens.append(processor.last_timing["time_to_first_token"])
+    elapsed = time.perf_counter() - start
+    ordered = sorted(first_tokens)
+    return _summary("chat", latencies, elapsed, len(latencies),
+                    ttft_p50_ms=round(percentile(ordered, 50) * 1000, 1),
+                    ttft_p95_ms=round(percentile(ordered, 95) * 1000, 1))
+
+def parse_importtime(stderr, module):
+    """
+    Cumulative import time of `module` in ms from `-X importtime` output, plus
+    its direct imports as (name, cumulative ms) pairs, slowest first
+    """
+    total, children, pending = None, [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(fields[1]) / 1000
+        except (IndexError, ValueError):
+            continue  # column header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        # Children are printed before their parent, so collect depth-1 entries until the module appears
+        if depth == 1:
+            pending.append((name, cumulative))
+        elif depth == 0:
+            if name == module:
+                total, children = cumulative, pending
+            pending = []
+    return total, sorted(children, key=lambda child: -child[1])
+
+def bench_coldstart(args):
+    """
+    Wall time of a fresh interpreter importing each CLI module, and its
+    `-X importtime` cumulative import time against the budget (medians of N runs)
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    wall, importtime, heaviest = {}, {}, {}
+    for module in COLDSTART_MODULES:
+        runs, totals = [], []
+        for _ in range(args.coldstart_runs):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, "-c", f"import {module}"], cwd=here, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            runs.append(time.perf_counter() - t0)
+            profile = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=here,
+                                     check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            total, children = parse_importtime(profile.stderr, module)
+            totals.append(total)
+        wall[module] = round(statistics.median(runs) * 1000, 1)
+        importtime[module] = round(statistics.median(totals), 1)
+        heaviest[module] = [(name, round(ms, 1)) for name, ms in children[:3]]
+    return {
+        "scenario": "coldstart",
+        "import_ms": wall,
+        "importtime_ms": importtime,
+        "heaviest_imports": heaviest,
+        "budget_ms": args.import_budget_ms,
+        "over_budget": [module for module, ms in importtime.items() if ms > args.import_budget_ms],
+    }
+
+BENCHMARKS = {
+    "single": bench_single,
+    "batch": bench_batch,
+    "ranking": bench_ranking,
+    "chat": bench_chat,
+    "coldstart": bench_coldstart,
+}
+
+def format_result(result):
+    if result["scenario"] == "coldstart":
+        lines = ["🧊 coldstart  " + "  ".join(f"{m} {ms:.0f}ms" for m, ms in result["import_ms"].items())]
+        for module, ms in result["importtime_ms"].items():
+            status = "❌ over budget" if module in result["over_budget"] else "✅"
+            slowest = ", ".join(f"{name} {child_ms:.0f}ms" for name, child_ms in result["heaviest_imports"][module])
+            lines.append(f"   {module:<13} imports {ms:>6.1f}ms / {result['budget_ms']:.0f}ms {status}  ({slowest})")
+        return "\n".join(lines)
+    line = (f"⚡ {result['scenario']:<9} {result['requests']:>5} req  {result['rps']:>8.1f} req/s  "
+            f"p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  rss {result['peak_rss_mb']}MB")
+    if "ttft_p50_ms" in result:
+        line += f"  ttft p50 {result['ttft_p50_ms']}ms p95 {result['ttft_p95_ms']}ms"
+    if result.get("failed"):
+        line += f"  ❌ {result['failed']} failed"
+    return line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app against local mock APIs")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=50, help="Single-fetch requests (default: 50)")
+    parser.add_argument("--profiles", type=int, default=100, help="Profiles for batch and ranking (default: 100)")
+    parser.add_argument("--conversations", type=int, default=3, help="Chat conversations of 5 turns (default: 3)")
+    parser.add_argument("--workers", type=int, default=8, help="Worker pool size for batch and ranking (default: 8)")
+    parser.add_argument("--coldstart-runs", type=int, default=5, help="Interpreter launches per module (default: 5)")
+    parser.add_argument("--import-budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS,
+                        help=f"Max cumulative -X importtime per CLI module (default: {DEFAULT_IMPORT_BUDGET_MS})")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock base latency in seconds (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Mock latency jitter in seconds (default: 0.02)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock 503s (default: 0)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of mock 429s (default: 0)")
+    parser.add_argument("--payload-size", type=int, default=8000, help="Mock profile size in bytes (default: 8000)")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Mock seconds per token (default: 0.002)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    def config():
+        return MockConfig(args.latency, args.jitter, args.error_rate, args.rate_limit_rate,
+                          args.payload_size, args.token_delay)
+
+    with tempfile.TemporaryDirectory(prefix="vibe-bench-") as tmp, \
+            MockServer(crustdata_config=config()) as crustdata, \
+            MockServer(llama_config=config()) as llama:
+        # Must be set before the app modules are imported and their singletons created
+        os.environ.update({
+            "CRUSTDATA_BASE_URL": crustdata.url,
+            "LLAMA_BASE_URL": f"{llama.url}/compat/v1/",
+            "CRUSTDATA_API_TOKEN": os.getenv("CRUSTDATA_API_TOKEN") or "bench",
+            "LLAMA_API_KEY": os.getenv("LLAMA_API_KEY") or "bench",
+            "ENRICHMENT_CACHE_PATH": os.path.join(tmp, "enrichment_cache.db"),
+            "CANDIDATE_STORE_PATH": os.path.join(tmp, "candidates.db"),
+            "SIMILARITY_INDEX_PATH": os.path.join(tmp, "similarity_index"),
+            "HTTP_BACKOFF_BASE": os.getenv("HTTP_BACKOFF_BASE", "0.05"),
+        })
+        os.environ.pop("LLM_CACHE_PATH", None)
+
+        results = []
+        for name in args.scenarios:
+            result = BENCHMARKS[name](args)
+            results.append(result)
+            print(format_result(result))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+    return 1 if any(r.get("over_budget") for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+SQLite candidate store.
+
+Every enriched profile is kept as a JSON document keyed by the normalized
+LinkedIn URL in the record itself (see candidate_key), with indexed name /
+current company / current title columns for lookups. The URL a profile was
+requested with, and any other URL in the record, are kept as aliases, so
+get(), analyses() and friends accept any of them. The database runs in WAL mode with one connection per thread, so
+the Streamlit app and analysis tools can read while a batch fetch is writing.
+
+person_data.json is still written for the current candidate, but it is now
+just a view of one row in this store.
+
+The latest LLM analysis per candidate, kind ("general" / "job_fit") and job
+description is kept alongside, so a profile refresh knows what to re-run.
+Structured job fit results (see job_fit_schema.py) also get a row in
+job_fits with the score and decision as indexed columns, so ranking or
+aggregating thousands of analyses for a job is one local query.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+from enrichment_cache import normalize_linkedin_url
+
+DEFAULT_STORE_PATH = "candidates.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    key TEXT PRIMARY KEY,
+    linkedin_url TEXT,
+    name TEXT COLLATE NOCASE,
+    current_company TEXT COLLATE NOCASE,
+    current_title TEXT COLLATE NOCASE,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_name ON candidates(name);
+CREATE INDEX IF NOT EXISTS idx_candidates_company ON candidates(current_company);
+CREATE INDEX IF NOT EXISTS idx_candidates_title ON candidates(current_title);
+CREATE INDEX IF NOT EXISTS idx_candidates_updated ON candidates(updated_at);
+CREATE INDEX IF NOT EXISTS idx_candidates_fetched ON candidates(fetched_at);
+CREATE TABLE IF NOT EXISTS analyses (
+    candidate_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    job_hash TEXT NOT NULL,
+    job_description TEXT,
+    analysis TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (candidate_key, kind, job_hash)
+);
+CREATE TABLE IF NOT EXISTS job_fits (
+    candidate_key TEXT NOT NULL,
+    job_hash TEXT NOT NULL,
+    fit_score INTEGER NOT NULL,
+    decision TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (candidate_key, job_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_job_fits_score ON job_fits(job_hash, fit_score DESC);
+CREATE TABLE IF NOT EXISTS candidate_aliases (
+    url TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_candidate_aliases_key ON candidate_aliases(key);
+"""
+
+UPSERT_SQL = (
+    "INSERT INTO candidates (key, linkedin_url, name, current_company, current_title, data, fetched_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET linkedin_url = excluded.linkedin_url, name = excluded.name, "
+    "current_company = excluded.current_company, current_title = excluded.current_title, "
+    "data = excluded.data, fetched_at = excluded.fetched_at, updated_at = excluded.updated_at"
+)
+
+ALIAS_SQL = "INSERT OR REPLACE INTO candidate_aliases (url, key) VALUES (?, ?)"
+
+def candidate_key(person):
+    """
+    Stable key for a person: the normalized LinkedIn URL from the record, else
+    the name. It depends only on the record, so every caller holding the same
+    person dict gets the same key whichever URL was used to fetch it.
+    """
+    url = person.get('linkedin_flagship_url') or person.get('linkedin_profile_url')
+    if url:
+        return normalize_linkedin_url(url)
+    return "name:" + (person.get('name') or 'unknown').strip().lower()
+
+def job_hash(job_description):
+    """Short stable hash identifying a job description ("" for none)"""
+    if not job_description:
+        return ""
+    return hashlib.sha256(job_description.strip().encode("utf-8")).hexdigest()[:16]
+
+def _row(person, profile_url, now):
+    return (
+        candidate_key(person),
+        profile_url or person.get('linkedin_flagship_url') or person.get('linkedin_profile_url'),
+        person.get('name'),
+        person.get('current_company_name'),
+        person.get('current_position_title'),
+        json.dumps(person, ensure_ascii=False),
+        now,
+        now,
+    )
+
+def _aliases(person, profile_url, key):
+    """Normalized URLs that should resolve to `key`"""
+    urls = (profile_url, person.get('linkedin_flagship_url'), person.get('linkedin_profile_url'))
+    return {normalize_linkedin_url(url): key for url in urls if url}
+
+class CandidateStore:
+    """
+    Keyed, indexed store of enriched person records
+    """
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, person, profile_url=None):
+        """Insert or replace one person record and return its key"""
+        row = _row(person, profile_url, time.time())
+        self._write([row], _aliases(person, profile_url, row[0]))
+        return row[0]
+
+    def bulk_upsert(self, people):
+        """
+        Insert or replace many records in one transaction.
+        `people` is an iterable of person dicts or (person, profile_url) pairs.
+        """
+        now = time.time()
+        rows, aliases = [], {}
+        for item in people:
+            person, profile_url = item if isinstance(item, tuple) else (item, None)
+            row = _row(person, profile_url, now)
+            rows.append(row)
+            aliases.update(_aliases(person, profile_url, row[0]))
+        self._write(rows, aliases)
+        return [row[0] for row in rows]
+
+    def key_for(self, person):
+        """
+        The store key for a person record, adding the record first if it is
+        not stored yet (e.g. a profile loaded from a file), so results saved
+        under the key always join back to a candidate row
+        """
+        key = candidate_key(person)
+        if self._conn().execute("SELECT 1 FROM candidates WHERE key = ?", (key,)).fetchone() is None:
+            self.upsert(person)
+        return key
+
+    def _write(self, rows, aliases):
+        conn = self._conn()
+        with conn:
+            for url, key in aliases.items():
+                if url != key:
+                    self._migrate(conn, url, key)
+            conn.executemany(UPSERT_SQL, rows)
+            conn.executemany(ALIAS_SQL, aliases.items())
+
+    def _migrate(self, conn, old_key, new_key):
+        """
+        Move a candidate stored under an older key (the requested URL) and its
+        analyses to the canonical key. Results already under the new key win.
+        """
+        conn.execute("DELETE FROM candidates WHERE key = ?", (old_key,))
+        for table in ("analyses", "job_fits"):
+            conn.execute(f"UPDATE OR IGNORE {table} SET candidate_key = ? WHERE candidate_key = ?", (new_key, old_key))
+            conn.execute(f"DELETE FROM {table} WHERE candidate_key = ?", (old_key,))
+
+    def get(self, key_or_url):
+        """Look up one person by key or LinkedIn URL, or None"""
+        row = self._conn().execute(
+            "SELECT data FROM candidates WHERE key = ?", (self._key(key_or_url),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find(self, name=None, company=None, title=None, limit=50):
+        """
+        Prefix search on the indexed columns (case-insensitive).
+        Returns summary dicts, most recently updated first.
+        """
+        clauses, params = [], []
+        for column, value in (("name", name), ("current_company", company), ("current_title", title)):
+            if value:
+                clauses.append(f"{column} LIKE ?")
+                params.append(value.strip() + "%")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT key, name, current_company, current_title, fetched_at FROM candidates {where} "
+            "ORDER BY updated_at DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [
+            {"key": r[0], "name": r[1], "current_company": r[2], "current_title": r[3], "fetched_at": r[4]}
+            for r in rows
+        ]
+
+    def latest(self):
+        """The most recently stored person, or None"""
+        row = self._conn().execute("SELECT data FROM candidates ORDER BY updated_at DESC LIMIT 1").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_people(self, batch_size=500):
+        """Yield every stored person record"""
+        cursor = self._conn().execute("SELECT data FROM candidates ORDER BY key")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield json.loads(row[0])
+
+    def stale(self, max_age_seconds, limit=None):
+        """
+        Candidates with a LinkedIn URL whose last fetch is older than
+        `max_age_seconds`, oldest first, as {key, linkedin_url, fetched_at} dicts
+        """
+        rows = self._conn().execute(
+            "SELECT key, linkedin_url, fetched_at FROM candidates "
+            "WHERE fetched_at < ? AND linkedin_url IS NOT NULL ORDER BY fetched_at LIMIT ?",
+            (time.time() - max_age_seconds, -1 if limit is None else limit),
+        ).fetchall()
+        return [{"key": r[0], "linkedin_url": r[1], "fetched_at": r[2]} for r in rows]
+
+    def touch(self, key_or_url):
+        """Mark a candidate as freshly fetched without rewriting its record"""
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE candidates SET fetched_at = ? WHERE key = ?", (time.time(), self._key(key_or_url)))
+
+    def save_analysis(self, key_or_url, kind, analysis, job_description=None):
+        """Keep the latest analysis of one kind (and job) for a candidate"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (candidate_key, kind, job_hash, job_description, analysis, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(key_or_url), kind, job_hash(job_description), job_description, analysis, time.time()),
+            )
+
+    def analyses(self, key_or_url):
+        """Stored analyses for a candidate, newest first"""
+        rows = self._conn().execute(
+            "SELECT kind, job_description, analysis, created_at FROM analyses "
+            "WHERE candidate_key = ? ORDER BY created_at DESC",
+            (self._key(key_or_url),),
+        ).fetchall()
+        return [
+            {"kind": r[0], "job_description": r[1], "analysis": r[2], "created_at": r[3]}
+            for r in rows
+        ]
+
+    def save_job_fit(self, key_or_url, job_description, result):
+        """
+        Keep a validated structured job fit result: the score and decision as
+        columns of job_fits, and the compact JSON as a "job_fit_structured"
+        analysis so a profile refresh re-runs it
+        """
+        key = self._key(key_or_url)
+        compact = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_fits (candidate_key, job_hash, fit_score, decision, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, job_hash(job_description), result["fit_score"], result["recommendation"]["decision"], compact, now),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (candidate_key, kind, job_hash, job_description, analysis, created_at) "
+                "VALUES (?, 'job_fit_structured', ?, ?, ?, ?)",
+                (key, job_hash(job_description), job_description, compact, now),
+            )
+
+    def top_job_fits(self, job_description, limit=50, min_score=None, decision=None):
+        """
+        Stored structured results for a job, best score first, joined with the
+        candidate's name, title and company. No LLM calls or text parsing.
+        """
+        clauses, params = ["f.job_hash = ?"], [job_hash(job_description)]
+        if min_score is not None:
+            clauses.append("f.fit_score >= ?")
+            params.append(min_score)
+        if decision:
+            clauses.append("f.decision = ?")
+            params.append(decision)
+        rows = self._conn().execute(
+            "SELECT f.candidate_key, c.name, c.current_title, c.current_company, f.fit_score, f.decision, f.result "
+            f"FROM job_fits f LEFT JOIN candidates c ON c.key = f.candidate_key WHERE {' AND '.join(clauses)} "
+            "ORDER BY f.fit_score DESC, f.created_at DESC LIMIT ?",
+            (*params, -1 if limit is None else limit),
+        ).fetchall()
+        return [
+            {"key": r[0], "name": r[1], "current_title": r[2], "current_company": r[3],
+             "fit_score": r[4], "decision": r[5], "result": json.loads(r[6])}
+            for r in rows
+        ]
+
+    def job_fit_summary(self, job_description):
+        """Count, average score, score histogram and decision counts for one job"""
+        conn = self._conn()
+        jh = job_hash(job_description)
+        count, average = conn.execute(
+            "SELECT COUNT(*), AVG(fit_score) FROM job_fits WHERE job_hash = ?", (jh,)
+        ).fetchone()
+        scores = dict(conn.execute(
+            "SELECT fit_score, COUNT(*) FROM job_fits WHERE job_hash = ? GROUP BY fit_score", (jh,)
+        ).fetchall())
+        decisions = dict(conn.execute(
+            "SELECT decision, COUNT(*) FROM job_fits WHERE job_hash = ? GROUP BY decision", (jh,)
+        ).fetchall())
+        return {"count": count, "average_score": average, "scores": scores, "decisions": decisions}
+
+    def job_fit_jobs(self):
+        """Jobs with stored structured results, as {job_hash, job_description, count}, most recent first"""
+        rows = self._conn().execute(
+            "SELECT job_hash, job_description, COUNT(*), MAX(created_at) FROM analyses "
+            "WHERE kind = 'job_fit_structured' GROUP BY job_hash ORDER BY MAX(created_at) DESC"
+        ).fetchall()
+        return [{"job_hash": r[0], "job_description": r[1], "count": r[2]} for r in rows]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def delete(self, key_or_url):
+        key = self._key(key_or_url)
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM candidates WHERE key = ?", (key,))
+            conn.execute("DELETE FROM analyses WHERE candidate_key = ?", (key,))
+            conn.execute("DELETE FROM job_fits WHERE candidate_key = ?", (key,))
+            conn.execute("DELETE FROM candidate_aliases WHERE key = ?", (key,))
+
+    def _key(self, key_or_url):
+        """The canonical key for a key or any URL the candidate is known by"""
+        if key_or_url.startswith("name:"):
+            return key_or_url
+        url = normalize_linkedin_url(key_or_url)
+        row = self._conn().execute("SELECT key FROM candidate_aliases WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else url
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_candidate_store():
+    """Return the process-wide store at CANDIDATE_STORE_PATH (default candidates.db)"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CandidateStore(os.getenv("CANDIDATE_STORE_PATH", DEFAULT_STORE_PATH))
+        return _default_store
@@ -0,0 +1,87 @@
+"""
+Multi-turn Intel Chat about a single candidate.
+
+The condensed profile goes into a system message once, and each question is
+sent together with the conversation so far, so follow-ups like "and before
+that?" make sense. History is kept within a token budget: when it grows too
+large the oldest turns are dropped and replaced by a one-line note of what
+was asked, rather than re-sending the full profile with every question.
+"""
+
+from llm_cache import person_fingerprint
+from profile_condenser import estimate_tokens
+from token_budget import fit_profile_to_budget, DEFAULT_PROMPT_TOKEN_BUDGET
+
+SYSTEM_PROMPT = """You are a recruiting assistant answering questions about one candidate.
+Base every answer on the profile data below; say so when the data doesn't cover a question.
+
+Person Data:
+{profile}"""
+
+DEFAULT_HISTORY_TOKEN_BUDGET = 3000
+
+class ChatSession:
+    """
+    Conversation state for chatting with a LlamaProcessor about one person
+    """
+    def __init__(self, person, processor, history_token_budget=DEFAULT_HISTORY_TOKEN_BUDGET):
+        self.processor = processor
+        self.history_token_budget = history_token_budget
+        self.fingerprint = person_fingerprint(person)
+        # The profile gets whatever the prompt budget leaves after the history
+        prompt_budget = getattr(processor, "prompt_token_budget", DEFAULT_PROMPT_TOKEN_BUDGET)
+        profile_json, self.profile_stats = fit_profile_to_budget(
+            person, max(512, prompt_budget - history_token_budget)
+        )
+        self.system_message = {"role": "system", "content": SYSTEM_PROMPT.format(profile=profile_json)}
+        self.history = []
+        self.dropped_questions = []
+        self.last_payload_tokens = None
+
+    def build_messages(self, question):
+        """
+        Messages for the next request: system prompt, a note of dropped turns,
+        the retained history and the new question
+        """
+        messages = [self.system_message]
+        if self.dropped_questions:
+            earlier = "; ".join(self.dropped_questions[-10:])
+            messages.append({"role": "system", "content": f"Earlier in this conversation the user asked about: {earlier}"})
+        messages.extend(self.history)
+        messages.append({"role": "user", "content": question})
+        self.last_payload_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        return messages
+
+    def ask(self, question):
+        """Send a question and return the full answer"""
+        completion = self.processor.create_completion(self.build_messages(question))
+        answer = completion.choices[0].message.content
+        self._record(question, answer)
+        return answer
+
+    def stream(self, question):
+        """Send a question and yield the answer's tokens as they arrive"""
+        parts = []
+        for token in self.processor.stream_chat(self.build_messages(question)):
+            parts.append(token)
+            yield token
+        self._record(question, "".join(parts))
+
+    def reset(self):
+        self.history = []
+        self.dropped_questions = []
+
+    def _record(self, question, answer):
+        self.history.append({"role": "user", "content": question})
+        self.history.append({"role": "assistant", "content": answer})
+        self._trim_history()
+
+    def _trim_history(self):
+        """Drop the oldest question/answer pairs until history fits the budget"""
+        while len(self.history) > 2 and self._history_tokens() > self.history_token_budget:
+            question = self.history[0]["content"]
+            self.history = self.history[2:]
+            self.dropped_questions.append(question if len(question) <= 120 else question[:117] + "...")
+
+    def _history_tokens(self):
+        return sum(estimate_tokens(m["content"]) for m in self.history)
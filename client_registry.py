@@ -0,0 +1,100 @@
+"""
+Process-wide registry of pooled Llama API clients.
+
+Building an OpenAI client per request also builds a fresh HTTP connection
+pool, so every call pays TCP and TLS setup again. The registry hands out one
+shared client per configuration, backed by an httpx pool with keep-alive, and
+is safe to use from Streamlit's script threads and worker pools.
+get_async_llama_client() does the same for AsyncOpenAI; an async connection
+pool belongs to one event loop, so those are shared per loop.
+
+Pool size and timeouts come from the environment:
+    LLAMA_BASE_URL          API base URL (default: Llama compat endpoint)
+    LLAMA_POOL_SIZE         max concurrent connections (default: 20)
+    LLAMA_TIMEOUT           read timeout in seconds (default: 60)
+    LLAMA_CONNECT_TIMEOUT   connect timeout in seconds (default: 10)
+    LLAMA_KEEPALIVE_EXPIRY  idle seconds before a pooled connection closes (default: 30)
+
+The SDK's own retries are disabled; http_transport retries Llama calls with
+the same backoff and circuit breaker as the CrustData requests.
+"""
+
+import os
+import threading
+
+DEFAULT_BASE_URL = "https://api.llama.com/compat/v1/"
+
+_clients = {}
+_async_clients = {}  # event loop → {config key: client}
+_lock = threading.Lock()
+
+def _setting(name, default):
+    return float(os.getenv(name, default))
+
+def _config(timeout, pool_size, connect_timeout):
+    return (
+        os.environ.get("LLAMA_API_KEY"),
+        os.getenv("LLAMA_BASE_URL", DEFAULT_BASE_URL),
+        timeout or _setting("LLAMA_TIMEOUT", 60),
+        connect_timeout or _setting("LLAMA_CONNECT_TIMEOUT", 10),
+        int(pool_size or _setting("LLAMA_POOL_SIZE", 20)),
+    )
+
+def _build(config, asynchronous=False):
+    # The SDK takes a large share of CLI startup, so it loads on first use
+    import httpx
+    import openai
+    api_key, base_url, timeout, connect_timeout, pool_size = config
+    timeouts = httpx.Timeout(timeout, connect=connect_timeout)
+    http_client_class = httpx.AsyncClient if asynchronous else httpx.Client
+    client_class = openai.AsyncOpenAI if asynchronous else openai.OpenAI
+    http_client = http_client_class(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=_setting("LLAMA_KEEPALIVE_EXPIRY", 30),
+        ),
+        timeout=timeouts,
+    )
+    return client_class(api_key=api_key, base_url=base_url, timeout=timeouts,
+                        http_client=http_client, max_retries=0)
+
+def get_llama_client(timeout=None, pool_size=None, connect_timeout=None):
+    """
+    Return the shared OpenAI-compatible client for this configuration,
+    creating it (and its connection pool) on first use
+    """
+    key = _config(timeout, pool_size, connect_timeout)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _build(key)
+        return client
+
+def get_async_llama_client(timeout=None, pool_size=None, connect_timeout=None):
+    """
+    Async version of get_llama_client, shared within the running event loop.
+    Must be called from a coroutine.
+    """
+    import asyncio
+    key = _config(timeout, pool_size, connect_timeout)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        # Clients of finished loops can't be used again; let them go
+        for closed in [other for other in _async_clients if other.is_closed()]:
+            del _async_clients[closed]
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = _build(key, asynchronous=True)
+        return client
+
+def close_all():
+    """
+    Close every pooled sync client, e.g. at interpreter shutdown. Async
+    clients are dropped with their event loop.
+    """
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -1,67 +1,273 @@
-import requests
 import os
+import re
 import json
 import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from enrichment_cache import get_enrichment_cache, normalize_linkedin_url
+from candidate_store import get_candidate_store
+from http_transport import get_transport, format_metrics
+from metrics import get_metrics
+from singleflight import get_single_flight
 
 # Load environment variables from .env file
 load_dotenv()
 
-def fetch_person_data(linkedin_url=None):
-    """Fetch person data from CrustData API"""
-    url = "https://api.crustdata.com/screener/person/enrich"
-    
-    # Use provided URL or default
-    profile_url = linkedin_url or "https://www.linkedin.com/in/abhilashchowdhary/"
-    
-    params = {
-        "linkedin_profile_url": profile_url,
-        "enrich_real_time": "true"
-    }
+CRUSTDATA_BASE_URL = os.getenv("CRUSTDATA_BASE_URL", "https://api.crustdata.com").rstrip("/")
+ENRICH_URL = CRUSTDATA_BASE_URL + "/screener/person/enrich"
+DEFAULT_PROFILE_URL = "https://www.linkedin.com/in/abhilashchowdhary/"
 
+def _get_headers():
+    """Build the CrustData auth headers from the environment"""
     # Get API token from environment variable
     api_token = os.getenv('CRUSTDATA_API_TOKEN')
     if not api_token:
         raise ValueError("CRUSTDATA_API_TOKEN environment variable is not set")
 
-    headers = {
+    return {
         "authorization": f"Token {api_token}",
         "accept": "application/json"
     }
 
-    print("🔍 Fetching person data from CrustData API...")
-    print(f"🔗 Profile: {profile_url}")
-    response = requests.get(url, headers=headers, params=params)
+def request_person_data(profile_url, force_refresh=False, cache=None, real_time=True):
+    """
+    Call the CrustData enrich endpoint for one profile and return the parsed JSON.
+    Responses are served from the enrichment cache when possible; pass
+    force_refresh=True to skip the lookup and re-fetch. real_time=False asks
+    CrustData for its stored record instead of a live scrape. Concurrent
+    fetches of the same profile share one request. Rate limits and 5xx
+    errors are retried by the shared transport. Raises RuntimeError on a
+    non-200 response.
+    """
+    cache = cache or get_enrichment_cache()
+    if not force_refresh:
+        cached = _cached_person_data(cache, profile_url)
+        if cached is not None:
+            return cached
+
+    params = {
+        "linkedin_profile_url": profile_url,
+        "enrich_real_time": "true" if real_time else "false"
+    }
+
+    def fetch():
+        with get_metrics().span("crustdata.fetch"):
+            response = get_transport().request(
+                "GET", ENRICH_URL, endpoint="crustdata.enrich", headers=_get_headers(), params=params
+            )
+        return _handle_response(response, profile_url, cache)
+
+    return get_single_flight("crustdata").do((normalize_linkedin_url(profile_url), real_time), fetch)
+
+async def async_request_person_data(profile_url, client, force_refresh=False, cache=None):
+    """
+    Async version of request_person_data using a shared httpx.AsyncClient
+    """
+    cache = cache or get_enrichment_cache()
+    if not force_refresh:
+        cached = _cached_person_data(cache, profile_url)
+        if cached is not None:
+            return cached
+
+    params = {
+        "linkedin_profile_url": profile_url,
+        "enrich_real_time": "true"
+    }
+
+    async def fetch():
+        with get_metrics().span("crustdata.fetch"):
+            response = await get_transport().arequest(
+                client, "GET", ENRICH_URL, endpoint="crustdata.enrich", headers=_get_headers(), params=params
+            )
+        return _handle_response(response, profile_url, cache)
+
+    return await get_single_flight("crustdata").ado((normalize_linkedin_url(profile_url), True), fetch)
+
+def _cached_person_data(cache, profile_url):
+    """Enrichment cache lookup that also counts hits and misses"""
+    cached = cache.get(profile_url)
+    get_metrics().incr("cache.hit" if cached is not None else "cache.miss", cache="enrichment")
+    return cached
 
-    if response.status_code == 200:
+def _handle_response(response, profile_url, cache):
+    """Record payload sizes, then parse and cache a CrustData response"""
+    metrics = get_metrics()
+    metrics.observe("crustdata.request_bytes", len(str(response.request.url)))
+    metrics.observe("crustdata.response_bytes", len(response.content))
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.status_code} {response.text}")
+    with metrics.span("crustdata.parse"):
         data = response.json()
-        print("✅ Data fetched successfully!")
-        
-        # Save data to JSON file
-        filename = "person_data.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        print(f"💾 Data saved to {filename}")
-        
-        # Show brief summary if data is available
-        if data and len(data) > 0:
-            person = data[0] if isinstance(data, list) else data
-            name = person.get('name', 'Unknown')
-            current_title = person.get('current_position_title', 'Unknown')
-            current_company = person.get('current_company_name', 'Unknown')
-            print(f"👤 Name: {name}")
-            print(f"💼 Current Role: {current_title} at {current_company}")
-            print(f"📊 Data records: {len(data) if isinstance(data, list) else 1}")
-        
-        print("\n🎯 Ready for analysis! Run 'python llama_client.py' to analyze this data.")
-        return True
-        
-    else:
-        print("Error:", response.status_code, response.text)
+    cache.put(profile_url, data)
+    return data
+
+def save_person_data(data, profile_url, filename="person_data.json"):
+    """
+    Upsert fetched records into the candidate store and similarity index and,
+    when `filename` is set, write the response out as the current candidate
+    for tools that read the file
+    """
+    people = data if isinstance(data, list) else [data]
+    with get_metrics().span("crustdata.save"):
+        if people:
+            # The requested URL becomes an alias of the first record's key
+            keys = get_candidate_store().bulk_upsert([(people[0], profile_url)] + people[1:])
+            # Imported here: NumPy is only needed once there is something to index
+            from similarity_index import get_similarity_index, EmbedderMismatchError
+            try:
+                get_similarity_index().add_many(list(zip(people, keys)))
+            except EmbedderMismatchError:
+                # Left alone until --rebuild; the index already warned when it loaded
+                pass
+        if filename:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+
+def fetch_person_data(linkedin_url=None, force_refresh=False):
+    """Fetch person data from CrustData API (or the local enrichment cache)"""
+    # Use provided URL or default
+    profile_url = linkedin_url or DEFAULT_PROFILE_URL
+
+    print("🔍 Fetching person data from CrustData API...")
+    print(f"🔗 Profile: {profile_url}")
+    try:
+        data = request_person_data(profile_url, force_refresh=force_refresh)
+    except RuntimeError as e:
+        print("Error:", e)
         return False
 
+    print("✅ Data fetched successfully!")
+    
+    # Save data to the candidate store and JSON file
+    filename = "person_data.json"
+    save_person_data(data, profile_url, filename)
+    
+    print(f"💾 Data saved to {filename} and the candidate store")
+    
+    # Show brief summary if data is available
+    if data and len(data) > 0:
+        person = data[0] if isinstance(data, list) else data
+        name = person.get('name', 'Unknown')
+        current_title = person.get('current_position_title', 'Unknown')
+        current_company = person.get('current_company_name', 'Unknown')
+        print(f"👤 Name: {name}")
+        print(f"💼 Current Role: {current_title} at {current_company}")
+        print(f"📊 Data records: {len(data) if isinstance(data, list) else 1}")
+    
+    print("\n🎯 Ready for analysis! Run 'python llama_client.py' to analyze this data.")
+    return True
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls out to at most `rate` per second
+    """
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        """Block until the caller is allowed to make its next request"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+def load_profile_urls(filename):
+    """
+    Read LinkedIn profile URLs from a text file, one per line.
+    Blank lines and lines starting with '#' are skipped.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+def profile_filename(profile_url):
+    """Derive a stable file name for a profile from its LinkedIn slug"""
+    match = re.search(r"/in/([^/?#]+)", profile_url)
+    slug = match.group(1) if match else profile_url
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", slug).strip("_").lower() + ".json"
+
+def fetch_people_data(linkedin_urls, output_dir="profiles", max_workers=8, requests_per_second=5, force_refresh=False):
+    """
+    Fetch many profiles from CrustData concurrently.
+
+    `linkedin_urls` is an iterable of profile URLs or the path to a file with one
+    URL per line. Requests go through a bounded thread pool and a shared rate
+    limiter. Each profile is upserted into the candidate store and, when
+    `output_dir` is set, also written to its own file there.
+    Cached profiles skip the network and the rate limiter.
+    Returns a list of result dicts (url, file, ok, error) in input order.
+    """
+    if isinstance(linkedin_urls, str):
+        linkedin_urls = load_profile_urls(linkedin_urls)
+    # De-duplicate while keeping the caller's order
+    urls = list(dict.fromkeys(linkedin_urls))
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    limiter = RateLimiter(requests_per_second)
+    cache = get_enrichment_cache()
+
+    def fetch_one(profile_url):
+        data = None if force_refresh else _cached_person_data(cache, profile_url)
+        if data is None:
+            limiter.wait()
+            data = request_person_data(profile_url, force_refresh=True)
+        path = os.path.join(output_dir, profile_filename(profile_url)) if output_dir else None
+        save_person_data(data, profile_url, path)
+        return path
+
+    print(f"🔍 Fetching {len(urls)} profiles ({max_workers} workers, {requests_per_second or 'unlimited'} req/s)...")
+    start = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_one, url): url for url in urls}
+        for done, future in enumerate(as_completed(futures), 1):
+            url = futures[future]
+            try:
+                path = future.result()
+                results[url] = {"url": url, "file": path, "ok": True, "error": None}
+                print(f"✅ [{done}/{len(urls)}] {url} → {path}")
+            except Exception as e:
+                results[url] = {"url": url, "file": None, "ok": False, "error": str(e)}
+                print(f"❌ [{done}/{len(urls)}] {url}: {e}")
+
+    ok = sum(1 for r in results.values() if r["ok"])
+    print(f"\n📊 {ok}/{len(urls)} profiles saved to the candidate store"
+          + (f" and {output_dir}/" if output_dir else "")
+          + f" in {time.perf_counter() - start:.1f}s")
+    print(format_metrics(get_transport().metrics()))
+    return [results[url] for url in urls]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch person data from CrustData API")
+    parser.add_argument("linkedin_url", nargs="?", help="LinkedIn profile URL to fetch")
+    parser.add_argument("--batch", metavar="FILE", help="File with one LinkedIn URL per line")
+    parser.add_argument("--output-dir", default="profiles", help="Directory for batch results (default: profiles)")
+    parser.add_argument("--workers", type=int, default=8, help="Max concurrent requests in batch mode (default: 8)")
+    parser.add_argument("--rps", type=float, default=5, help="Max requests per second in batch mode, 0 for no limit (default: 5)")
+    parser.add_argument("--force-refresh", action="store_true", help="Ignore cached responses and re-fetch from CrustData")
+    parser.add_argument("--cache-stats", action="store_true", help="Print enrichment cache statistics and exit")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    # Get LinkedIn URL from command line argument if provided
-    linkedin_url = sys.argv[1] if len(sys.argv) > 1 else None
-    fetch_person_data(linkedin_url)
+    args = parse_args()
+    if args.cache_stats:
+        stats = get_enrichment_cache().stats()
+        print(f"💾 Cache entries: {stats['entries']}")
+        print(f"🎯 Hits: {stats['lifetime_hits']}  Misses: {stats['lifetime_misses']}  Hit rate: {stats['hit_rate']:.0%}")
+    elif args.batch:
+        results = fetch_people_data(args.batch, output_dir=args.output_dir,
+                                    max_workers=args.workers, requests_per_second=args.rps,
+                                    force_refresh=args.force_refresh)
+        sys.exit(0 if all(r["ok"] for r in results) else 1)
+    else:
+        fetch_person_data(args.linkedin_url, force_refresh=args.force_refresh)
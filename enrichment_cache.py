@@ -0,0 +1,207 @@
+"""
+Persistent on-disk cache for CrustData enrichment responses.
+
+Entries live in a small SQLite database keyed by the normalized LinkedIn URL,
+so repeat scouts of the same profile don't hit the paid enrich endpoint again.
+Each entry has its own TTL and the table is trimmed to a maximum size by
+evicting the least recently used rows.
+
+The file is shared by the app, batch fetches and refresh jobs, so it runs in
+WAL mode and lookups don't write: access times and hit/miss counters are
+kept in memory and written in batches (every FLUSH_EVERY lookups or
+FLUSH_INTERVAL seconds, before each put, and on stats() and close()).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+DEFAULT_CACHE_PATH = "enrichment_cache.db"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+FLUSH_EVERY = 100
+FLUSH_INTERVAL = 5.0
+
+def normalize_linkedin_url(url):
+    """
+    Normalize a LinkedIn profile URL so equivalent spellings share a cache key.
+    Drops scheme differences, 'www.'/country subdomains, query strings,
+    fragments and trailing slashes, and lowercases the result.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    host = parts.netloc.lower().split("@")[-1].split(":")[0]
+    if host.endswith("linkedin.com"):
+        host = "linkedin.com"
+    path = parts.path.rstrip("/").lower()
+    return f"https://{host}{path}"
+
+class EnrichmentCache:
+    """
+    SQLite-backed cache of enrichment responses with per-entry TTL and LRU eviction
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._accessed = {}
+        self._expired = set()
+        self._counts = {"hits": 0, "misses": 0}
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def get(self, url):
+        """Return the cached response for `url`, or None on a miss or expired entry"""
+        key = normalize_linkedin_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[1] > now:
+                self._accessed[key] = now
+                self._count("hits")
+                self.hits += 1
+                return json.loads(row[0])
+            if row:
+                self._expired.add(key)
+            self._count("misses")
+            self.misses += 1
+            return None
+
+    def put(self, url, data, ttl_seconds=None):
+        """Store a response for `url`, then evict least recently used entries over the size bound"""
+        key = normalize_linkedin_url(url)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        with self._lock:
+            # Pending access times first, so eviction sees recent hits
+            self._flush()
+            self._expired.discard(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, data, created_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(data, ensure_ascii=False), now, now + ttl, now),
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    "SELECT key FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def invalidate(self, url):
+        """Drop the cached entry for `url` if there is one"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (normalize_linkedin_url(url),))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Hit/miss counters for this process plus lifetime totals stored in the database
+        """
+        with self._lock:
+            self._flush()
+            totals = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lifetime_hits = totals.get("hits", 0)
+        lifetime_misses = totals.get("misses", 0)
+        lookups = lifetime_hits + lifetime_misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "lifetime_hits": lifetime_hits,
+            "lifetime_misses": lifetime_misses,
+            "hit_rate": lifetime_hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+    def _count(self, name):
+        """Note a lookup in memory and write the batch when it is due (call with _lock held)"""
+        self._counts[name] += 1
+        self._unflushed += 1
+        if self._unflushed >= FLUSH_EVERY or time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            try:
+                self._flush()
+            except sqlite3.OperationalError:
+                # Another process holds the write lock; keep the batch for next time
+                self._conn.rollback()
+
+    def _flush(self):
+        """Write and commit pending access times, expiries and counters (call with _lock held)"""
+        if not self._unflushed:
+            return
+        # Only if still expired: another process may have refreshed the entry meanwhile
+        now = time.time()
+        self._conn.executemany("DELETE FROM entries WHERE key = ? AND expires_at <= ?",
+                               [(key, now) for key in self._expired])
+        self._conn.executemany(
+            "UPDATE entries SET last_access = MAX(last_access, ?) WHERE key = ?",
+            [(at, key) for key, at in self._accessed.items()],
+        )
+        self._conn.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, value) for name, value in self._counts.items() if value],
+        )
+        self._conn.commit()
+        self._accessed = {}
+        self._expired = set()
+        self._counts = {"hits": 0, "misses": 0}
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_enrichment_cache():
+    """
+    Return the process-wide cache, configured from ENRICHMENT_CACHE_PATH,
+    ENRICHMENT_CACHE_TTL (seconds) and ENRICHMENT_CACHE_MAX_ENTRIES
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EnrichmentCache(
+                path=os.getenv("ENRICHMENT_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_seconds=float(os.getenv("ENRICHMENT_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                max_entries=int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+        return _default_cache
@@ -0,0 +1,29 @@
+// Client for the long-lived Python analysis worker (analysis_worker.py)
+const WORKER_URL = process.env.ANALYSIS_WORKER_URL ?? 'http://127.0.0.1:8765'
+const WORKER_TIMEOUT_MS = 120000
+
+export type WorkerResponse = {
+  status: number
+  body: { success: boolean; analysis?: string; error?: string }
+}
+
+export async function callAnalysisWorker(path: string, payload: unknown): Promise<WorkerResponse> {
+  try {
+    const response = await fetch(`${WORKER_URL}${path}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(payload),
+      signal: AbortSignal.timeout(WORKER_TIMEOUT_MS),
+    })
+    return { status: response.status, body: await response.json() }
+  } catch (error) {
+    console.error('Analysis worker error:', error)
+    return {
+      status: 502,
+      body: {
+        success: false,
+        error: 'Analysis worker unavailable. Start it with `python analysis_worker.py`.',
+      },
+    }
+  }
+}
@@ -0,0 +1,360 @@
+"""
+Shared transport layer for CrustData and Llama calls.
+
+Wraps outbound requests with:
+  - a pooled requests.Session (keep-alive, configurable pool size)
+  - per-call connect/read timeouts
+  - exponential backoff with full jitter on 429/5xx and connection errors,
+    honoring Retry-After when the server sends one
+  - a per-endpoint circuit breaker that fails fast while an upstream is down
+  - per-endpoint latency / error / retry counters
+
+The same retry policy, breakers and counters are used by the sync and async
+paths, so bulk runs see one consistent view of each upstream.
+
+Settings come from the environment:
+    HTTP_MAX_RETRIES        retries per call (default: 4)
+    HTTP_BACKOFF_BASE       first backoff step in seconds (default: 0.5)
+    HTTP_BACKOFF_MAX        cap on a single backoff sleep (default: 30)
+    HTTP_CONNECT_TIMEOUT    connect timeout in seconds (default: 10)
+    HTTP_READ_TIMEOUT       read timeout in seconds (default: 60)
+    HTTP_POOL_SIZE          pooled connections per host (default: 20)
+    CIRCUIT_FAILURE_THRESHOLD  consecutive failures before opening (default: 5)
+    CIRCUIT_RESET_TIMEOUT   seconds before a half-open probe (default: 30)
+"""
+
+import os
+import sys
+import time
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+def _env(name, default):
+    return float(os.getenv(name, default))
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the upstream while its circuit is open"""
+
+class RetryableStatusError(RuntimeError):
+    """A response with a retryable status that ran out of retries"""
+    def __init__(self, status_code, text, retry_after=None):
+        super().__init__(f"{status_code} {text}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, capped, deferring to Retry-After
+    """
+    def __init__(self, max_retries=None, base_delay=None, max_delay=None):
+        self.max_retries = int(max_retries if max_retries is not None else _env("HTTP_MAX_RETRIES", 4))
+        self.base_delay = base_delay if base_delay is not None else _env("HTTP_BACKOFF_BASE", 0.5)
+        self.max_delay = max_delay if max_delay is not None else _env("HTTP_BACKOFF_MAX", 30)
+
+    def delay(self, attempt, retry_after=None):
+        """Sleep before retry number `attempt` (1-based)"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; after `reset_timeout`
+    one probe call is let through and closes the circuit if it succeeds
+    """
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = int(failure_threshold or _env("CIRCUIT_FAILURE_THRESHOLD", 5))
+        self.reset_timeout = reset_timeout or _env("CIRCUIT_RESET_TIMEOUT", 30)
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """
+        Settle a call that says nothing about upstream health (a non-retryable
+        error, an interrupt) so a half-open probe slot is not held forever
+        """
+        with self._lock:
+            self._probing = False
+
+class EndpointStats:
+    """
+    Rolling latency and error counters for one upstream endpoint
+    """
+    def __init__(self, window=1000):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok, retries=0):
+        with self._lock:
+            self.requests += 1
+            self.retries += retries
+            if not ok:
+                self.errors += 1
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            requests_, errors, retries = self.requests, self.errors, self.retries
+
+        def pct(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+        return {
+            "requests": requests_,
+            "errors": errors,
+            "retries": retries,
+            "error_rate": errors / requests_ if requests_ else 0.0,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+        }
+
+class Transport:
+    """
+    Retrying, circuit-broken HTTP client shared by every upstream call
+    """
+    def __init__(self, policy=None, pool_size=None, connect_timeout=None, read_timeout=None):
+        self.policy = policy or RetryPolicy()
+        self.timeout = (
+            connect_timeout or _env("HTTP_CONNECT_TIMEOUT", 10),
+            read_timeout or _env("HTTP_READ_TIMEOUT", 60),
+        )
+        self.pool_size = int(pool_size or _env("HTTP_POOL_SIZE", 20))
+        self._session = None
+        self._breakers = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Pooled requests.Session, created on first use so importing stays cheap"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def breaker(self, endpoint):
+        with self._lock:
+            return self._breakers.setdefault(endpoint, CircuitBreaker())
+
+    def stats(self, endpoint):
+        with self._lock:
+            return self._stats.setdefault(endpoint, EndpointStats())
+
+    def request(self, method, url, endpoint, timeout=None, **kwargs):
+        """
+        Send a request with retries. Returns the final response (which may still
+        be a non-retryable error status); raises after exhausting retries.
+        """
+        def send():
+            response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            if response.status_code in RETRY_STATUSES:
+                raise RetryableStatusError(
+                    response.status_code, response.text,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+            return response
+
+        return self.call(send, endpoint, is_retryable=_is_retryable_http_error, is_error=_is_error_response)
+
+    async def arequest(self, client, method, url, endpoint, **kwargs):
+        """
+        Async version of request() for an httpx.AsyncClient
+        """
+        async def send():
+            response = await client.request(method, url, **kwargs)
+            if response.status_code in RETRY_STATUSES:
+                raise RetryableStatusError(
+                    response.status_code, response.text,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+            return response
+
+        return await self.acall(send, endpoint, is_retryable=_is_retryable_http_error,
+                                is_error=_is_error_response)
+
+    def call(self, fn, endpoint, is_retryable, retry_after=None, is_error=None):
+        """
+        Run fn() with the retry policy, circuit breaker and stats for `endpoint`.
+        `is_retryable(exc)` decides which exceptions are worth another attempt;
+        `retry_after(exc)` can extract a server-requested delay. `is_error(result)`
+        marks results that count as errors in the stats (e.g. a 404 response)
+        without tripping the breaker, since the upstream did answer.
+        """
+        breaker = self.breaker(endpoint)
+        stats = self.stats(endpoint)
+        attempt = 0
+        start = time.perf_counter()
+        while True:
+            if not breaker.allow():
+                stats.record(0.0, ok=False, retries=attempt)
+                raise CircuitOpenError(f"Circuit open for {endpoint}; upstream is failing")
+            try:
+                result = fn()
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+                if not retryable or attempt >= self.policy.max_retries:
+                    stats.record(time.perf_counter() - start, ok=False, retries=attempt)
+                    raise
+                attempt += 1
+                time.sleep(self.policy.delay(attempt, _retry_after(e, retry_after)))
+                continue
+            except BaseException:
+                # Interrupted or cancelled mid-call: free the probe slot, record nothing
+                breaker.release()
+                raise
+            breaker.record_success()
+            stats.record(time.perf_counter() - start, ok=not (is_error and is_error(result)), retries=attempt)
+            return result
+
+    async def acall(self, fn, endpoint, is_retryable, retry_after=None, is_error=None):
+        """
+        Async version of call(); fn is a coroutine function
+        """
+        # Imported here so sync-only CLIs don't pay for asyncio at startup
+        import asyncio
+        breaker = self.breaker(endpoint)
+        stats = self.stats(endpoint)
+        attempt = 0
+        start = time.perf_counter()
+        while True:
+            if not breaker.allow():
+                stats.record(0.0, ok=False, retries=attempt)
+                raise CircuitOpenError(f"Circuit open for {endpoint}; upstream is failing")
+            try:
+                result = await fn()
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+                if not retryable or attempt >= self.policy.max_retries:
+                    stats.record(time.perf_counter() - start, ok=False, retries=attempt)
+                    raise
+                attempt += 1
+                await asyncio.sleep(self.policy.delay(attempt, _retry_after(e, retry_after)))
+                continue
+            except BaseException:
+                # Interrupted or cancelled mid-call: free the probe slot, record nothing
+                breaker.release()
+                raise
+            breaker.record_success()
+            stats.record(time.perf_counter() - start, ok=not (is_error and is_error(result)), retries=attempt)
+            return result
+
+    def metrics(self):
+        """Per-endpoint counters, latency percentiles and circuit state"""
+        with self._lock:
+            endpoints = list(self._stats)
+        return {
+            endpoint: {**self.stats(endpoint).snapshot(), "circuit": self.breaker(endpoint).state}
+            for endpoint in endpoints
+        }
+
+def _is_error_response(response):
+    return not 200 <= response.status_code < 300
+
+def _is_retryable_http_error(exc):
+    if isinstance(exc, RetryableStatusError):
+        return True
+    # Only check libraries that are loaded; an exception can't come from one that isn't
+    requests, httpx = sys.modules.get("requests"), sys.modules.get("httpx")
+    if requests is not None and isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return httpx is not None and isinstance(exc, httpx.TransportError)
+
+def _retry_after(exc, extractor=None):
+    if isinstance(exc, RetryableStatusError):
+        return exc.retry_after
+    if extractor:
+        return extractor(exc)
+    return None
+
+def format_metrics(metrics):
+    """Human-readable per-endpoint summary lines"""
+    lines = []
+    for endpoint, m in metrics.items():
+        p50 = f"{m['p50_ms']:.0f}ms" if m["p50_ms"] is not None else "-"
+        p95 = f"{m['p95_ms']:.0f}ms" if m["p95_ms"] is not None else "-"
+        lines.append(
+            f"📡 {endpoint}: {m['requests']} calls, {m['errors']} errors, {m['retries']} retries, "
+            f"p50 {p50}, p95 {p95}, circuit {m['circuit']}"
+        )
+    return "\n".join(lines)
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+def get_transport():
+    """Return the process-wide transport"""
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
@@ -0,0 +1,128 @@
+"""
+Structured job fit results.
+
+The free-text job fit analysis has to be regex-parsed for its score and
+nothing else in it is machine-readable. In structured mode the model is asked
+for a JSON object matching JOB_FIT_SCHEMA instead (via response_format where
+the API honours it, and in the prompt either way). Replies are checked with
+parse_job_fit(), which raises InvalidJobFitError with a message that can be
+sent back to the model when a retry is needed.
+
+    {
+      "fit_score": 7,
+      "strengths": ["..."],
+      "gaps": ["..."],
+      "recommendation": {"decision": "yes", "reason": "..."},
+      "interview_questions": ["..."]
+    }
+"""
+
+import re
+import json
+
+DECISIONS = ("strong_yes", "yes", "maybe", "no")
+
+MAX_LIST_ITEMS = 10
+MAX_TEXT_CHARS = 500
+
+JOB_FIT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "fit_score": {"type": "integer", "minimum": 1, "maximum": 10},
+        "strengths": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_LIST_ITEMS},
+        "gaps": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_LIST_ITEMS},
+        "recommendation": {
+            "type": "object",
+            "properties": {
+                "decision": {"type": "string", "enum": list(DECISIONS)},
+                "reason": {"type": "string"},
+            },
+            "required": ["decision", "reason"],
+        },
+        "interview_questions": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_LIST_ITEMS},
+    },
+    "required": ["fit_score", "strengths", "gaps", "recommendation", "interview_questions"],
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "job_fit", "schema": JOB_FIT_SCHEMA},
+}
+
+class InvalidJobFitError(ValueError):
+    """A model reply that is not a valid structured job fit result"""
+
+def _extract_json(text):
+    """The JSON object in a reply, tolerating code fences and surrounding prose"""
+    text = (text or "").strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise InvalidJobFitError("reply contains no JSON object")
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise InvalidJobFitError(f"reply is not valid JSON: {e}") from None
+
+def _string_list(data, field):
+    value = data.get(field)
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise InvalidJobFitError(f"'{field}' must be a list of strings")
+    return [item.strip()[:MAX_TEXT_CHARS] for item in value if item.strip()][:MAX_LIST_ITEMS]
+
+def validate_job_fit(data):
+    """
+    Check a decoded result against JOB_FIT_SCHEMA and return a normalized
+    copy (score as int, whitespace stripped, lists and text capped)
+    """
+    if not isinstance(data, dict):
+        raise InvalidJobFitError("reply must be a JSON object")
+    missing = [field for field in JOB_FIT_SCHEMA["required"] if field not in data]
+    if missing:
+        raise InvalidJobFitError(f"missing fields: {', '.join(missing)}")
+
+    score = data["fit_score"]
+    if isinstance(score, str) and score.strip().isdigit():
+        score = int(score.strip())
+    if isinstance(score, float) and score.is_integer():
+        score = int(score)
+    if isinstance(score, bool) or not isinstance(score, int) or not 1 <= score <= 10:
+        raise InvalidJobFitError("'fit_score' must be an integer from 1 to 10")
+
+    recommendation = data["recommendation"]
+    if not isinstance(recommendation, dict):
+        raise InvalidJobFitError("'recommendation' must be an object with 'decision' and 'reason'")
+    decision = str(recommendation.get("decision", "")).strip().lower().replace(" ", "_")
+    if decision not in DECISIONS:
+        raise InvalidJobFitError(f"'recommendation.decision' must be one of {', '.join(DECISIONS)}")
+    reason = recommendation.get("reason")
+    if not isinstance(reason, str):
+        raise InvalidJobFitError("'recommendation.reason' must be a string")
+
+    return {
+        "fit_score": score,
+        "strengths": _string_list(data, "strengths"),
+        "gaps": _string_list(data, "gaps"),
+        "recommendation": {"decision": decision, "reason": reason.strip()[:MAX_TEXT_CHARS]},
+        "interview_questions": _string_list(data, "interview_questions"),
+    }
+
+def parse_job_fit(text):
+    """Decode and validate a model reply; raises InvalidJobFitError"""
+    return validate_job_fit(_extract_json(text))
+
+def format_job_fit(result):
+    """Markdown rendering of a structured result, in the free-text layout"""
+    def bullets(items):
+        return "\n".join(f"- {item}" for item in items) or "- None noted"
+
+    recommendation = result["recommendation"]
+    return (
+        f"1. **FIT SCORE**: {result['fit_score']}/10\n\n"
+        f"2. **STRENGTHS**:\n{bullets(result['strengths'])}\n\n"
+        f"3. **GAPS**:\n{bullets(result['gaps'])}\n\n"
+        f"4. **RECOMMENDATION**: {recommendation['decision'].replace('_', ' ')}. {recommendation['reason']}\n\n"
+        f"5. **NEXT STEPS**:\n{bullets(result['interview_questions'])}"
+    )
@@ -1,26 +1,99 @@
 import os
 import json
-from openai import OpenAI
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from llm_cache import get_response_cache, make_cache_key, person_fingerprint
+from token_budget import (fit_profile_to_budget, format_budget_stats, count_tokens, truncate_to_tokens,
+                          chunk_profile, pack_items, DEFAULT_PROMPT_TOKEN_BUDGET)
+from chat_session import ChatSession
+from client_registry import get_llama_client, get_async_llama_client
+from profile_loader import load_json_cached
+from http_transport import get_transport, parse_retry_after, RETRY_STATUSES
+from metrics import get_metrics, timed
+from singleflight import get_single_flight
+from job_fit_schema import RESPONSE_FORMAT, JOB_FIT_SCHEMA, InvalidJobFitError, parse_job_fit
 
 # Load environment variables
 load_dotenv()
 
+DEFAULT_MODEL = "Llama-4-Maverick-17B-128E-Instruct-FP8"
+
+# Focus areas for targeted analyses (used by the web frontend)
+ANALYSIS_FOCUS = {
+    "skills": "Analyze the person's technical and soft skills. Provide a comprehensive breakdown of their competencies, skill levels, and areas for improvement.",
+    "experience": "Analyze the person's work experience and career progression. Identify patterns, growth areas, and career trajectory insights.",
+    "education": "Analyze the person's educational background and how it relates to their career. Assess the relevance and impact of their education.",
+    "overall": "Provide a comprehensive professional analysis of this person including strengths, weaknesses, career potential, and recommendations for growth.",
+}
+
+# Closing instructions of the job fit prompt: numbered markdown sections, or JSON
+_JOB_FIT_REQUEST = """ANALYSIS REQUEST:
+        Please analyze if this candidate is a good fit for the job described above. Provide:
+        
+        1. **FIT SCORE** (1-10): Rate how well this candidate matches the job requirements
+        
+        2. **STRENGTHS**: What makes this candidate a good fit? List specific experiences, skills, or qualifications that align with the job.
+        
+        3. **GAPS**: What are the potential gaps or concerns? What might the candidate lack for this role?
+        
+        4. **RECOMMENDATION**: Should we proceed with this candidate? Why or why not?
+        
+        5. **NEXT STEPS**: If moving forward, what questions should we ask in an interview to validate fit?
+        
+        Format your response clearly with the numbered sections above.
+        """
+
+_STRUCTURED_JOB_FIT_REQUEST = """ANALYSIS REQUEST:
+        Please analyze if this candidate is a good fit for the job described above.
+        Reply with only a JSON object, no markdown, matching this schema:
+        
+        """ + json.dumps(JOB_FIT_SCHEMA) + """
+        
+        - fit_score: how well the candidate matches the job requirements, 1-10
+        - strengths: specific experiences, skills or qualifications that align with the job
+        - gaps: potential gaps or concerns for this role
+        - recommendation.decision: strong_yes, yes, maybe or no; recommendation.reason: one or two sentences why
+        - interview_questions: questions to ask in an interview to validate fit
+        """
+
 class LlamaProcessor:
-    def __init__(self):
-        self.client = OpenAI(
-            api_key=os.environ.get("LLAMA_API_KEY"), 
-            base_url="https://api.llama.com/compat/v1/"
+    def __init__(self, model=DEFAULT_MODEL, cache=None, sampling_params=None, timeout=None, client=None,
+                 prompt_token_budget=None):
+        # Clients come from a shared, pooled registry so constructing a processor is cheap
+        self.client = client or get_llama_client(timeout=timeout)
+        self.timeout = timeout
+        self.model = model
+        self.sampling_params = sampling_params or {}
+        # Pass cache=False to disable response caching entirely
+        self.cache = get_response_cache() if cache is None else cache or None
+        self.last_timing = None
+        # Upper bound on prompt size; profiles are trimmed by section priority to fit
+        self.prompt_token_budget = prompt_token_budget or int(
+            os.getenv("LLAMA_PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET)
         )
+        self.last_profile_stats = None
+        self.last_prompt_stats = None
+        self.last_map_reduce_stats = None
+        # "json_schema" sends response_format with structured job fit requests;
+        # "none" relies on the prompt alone, for endpoints that reject it
+        self.response_format = os.getenv("LLAMA_RESPONSE_FORMAT", "json_schema")
+        self.structured_attempts = int(os.getenv("LLAMA_STRUCTURED_ATTEMPTS", 3))
+    
+    @property
+    def async_client(self):
+        """
+        Pooled AsyncOpenAI client for the running event loop, with the same
+        pool size, timeouts and disabled SDK retries as self.client
+        """
+        return get_async_llama_client(timeout=self.timeout)
     
     def load_person_data(self, filename="person_data.json"):
         """
-        Load person data from JSON file
+        Load person data from JSON file (memoized until the file changes)
         """
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return data
+            return load_json_cached(filename)
         except FileNotFoundError:
             print(f"❌ Error: {filename} not found. Please run crustdata.py first.")
             return None
@@ -28,81 +101,463 @@ class LlamaProcessor:
             print(f"❌ Error: Invalid JSON in {filename}")
             return None
     
-    def analyze_job_fit(self, job_description, filename="person_data.json"):
+    def _load_person(self, filename="person_data.json"):
         """
-        Analyze if the person is a good fit for a specific job
+        Load the first person record from a JSON file
         """
         person_data = self.load_person_data(filename)
         if not person_data:
-            return "Unable to load person data."
+            return None
         
         # Handle list format from CrustData API
-        if isinstance(person_data, list) and len(person_data) > 0:
-            person = person_data[0]  # Get the first person
-        else:
-            person = person_data
+        if isinstance(person_data, list):
+            return person_data[0]
+        return person_data
+    
+    def analyze_job_fit(self, job_description, filename="person_data.json", force_refresh=False):
+        """
+        Analyze if the person is a good fit for a specific job
+        """
+        person = self._load_person(filename)
+        if not person:
+            return "Unable to load person data."
         
+        try:
+            return self.analyze_candidate(person, job_description, force_refresh=force_refresh)
+        except Exception as e:
+            return f"Error processing with Llama API: {str(e)}"
+    
+    def analyze_candidate(self, person, job_description, force_refresh=False):
+        """
+        Job fit analysis for an in-memory person record.
+        Unlike analyze_job_fit, API errors are raised so callers can retry.
+        """
         prompt = self._create_job_fit_prompt(person, job_description)
+        return self._complete(prompt, person=person, force_refresh=force_refresh)
+    
+    def analyze_candidate_structured(self, person, job_description, force_refresh=False):
+        """
+        Job fit analysis as a validated dict (fit_score, strengths, gaps,
+        recommendation, interview_questions; see job_fit_schema). A malformed
+        reply is sent back to the model with the validation error, up to
+        structured_attempts tries in all, before InvalidJobFitError is raised.
+        Only validated results are cached, and concurrent identical requests
+        share one call. API errors are raised.
+        """
+        prompt = self._create_job_fit_prompt(person, job_description, structured=True)
+        messages = self._user_message(prompt)
+        key = self._cache_key(messages, person)
+        cached = self._cached_response(key, force_refresh)
+        if cached is not None:
+            try:
+                return parse_job_fit(cached)
+            except InvalidJobFitError:
+                pass
+        
+        return get_single_flight("llm").do(
+            ("job_fit_structured", self._request_key(messages, person)),
+            lambda: self._request_structured(messages, key),
+        )
+    
+    def _request_structured(self, messages, key):
+        """Ask for a structured job fit result, re-asking on malformed replies"""
+        metrics = get_metrics()
+        kwargs = {"response_format": RESPONSE_FORMAT} if self.response_format == "json_schema" else {}
+        conversation = messages
+        for attempt in range(1, self.structured_attempts + 1):
+            completion = self.create_completion(conversation, **kwargs)
+            content = completion.choices[0].message.content
+            metrics.observe("llm.response_bytes", len((content or "").encode("utf-8")))
+            try:
+                result = parse_job_fit(content)
+            except InvalidJobFitError as e:
+                metrics.incr("llm.structured.invalid")
+                if attempt == self.structured_attempts:
+                    raise
+                conversation = messages + [
+                    {"role": "assistant", "content": content or ""},
+                    {"role": "user", "content": f"That reply was not valid: {e}. "
+                                                "Reply again with only the JSON object described above."},
+                ]
+                continue
+            if key is not None:
+                self.cache.set(key, json.dumps(result, ensure_ascii=False))
+            return result
+    
+    def general_analysis(self, filename="person_data.json", force_refresh=False, map_reduce=False):
+        """
+        General professional analysis of the person.
+        With map_reduce=True the profile is summarized section by section first.
+        """
+        person = self._load_person(filename)
+        if not person:
+            return "Unable to load person data."
         
         try:
-            completion = self.client.chat.completions.create(
-                model="Llama-4-Maverick-17B-128E-Instruct-FP8",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-            )
-            return completion.choices[0].message.content
+            if map_reduce:
+                return self.analyze_person_map_reduce(person, force_refresh=force_refresh)
+            return self.analyze_person(person, force_refresh=force_refresh)
         except Exception as e:
             return f"Error processing with Llama API: {str(e)}"
     
-    def general_analysis(self, filename="person_data.json"):
+    def analyze_focus(self, person, focus="overall", force_refresh=False):
         """
-        General professional analysis of the person
+        Targeted analysis of one aspect of a person record (see ANALYSIS_FOCUS).
+        API errors are raised.
         """
-        person_data = self.load_person_data(filename)
-        if not person_data:
-            return "Unable to load person data."
+        prompt = self._create_focus_prompt(person, focus)
+        return self._complete(prompt, person=person, force_refresh=force_refresh)
+    
+    def analyze_person(self, person, force_refresh=False):
+        """
+        General analysis for an in-memory person record.
+        Unlike general_analysis, API errors are raised so callers can retry.
+        """
+        prompt = self._create_general_prompt(person)
+        return self._complete(prompt, person=person, force_refresh=force_refresh)
+    
+    def analyze_person_map_reduce(self, person, job_description=None, max_workers=4,
+                                  chunk_tokens=1500, force_refresh=False):
+        """
+        Map-reduce analysis for long profiles: each section (long work histories
+        in several runs of roles) is summarized in parallel, then one reduce
+        prompt writes the general analysis, or the job fit analysis when a job
+        description is given. Chunk summaries go through the response cache,
+        so after a small profile change only the changed chunks are re-sent.
+        API errors are raised.
+        """
+        name = person.get('name', 'Unknown')
+        header, chunks = chunk_profile(person, chunk_tokens)
+        prompts = [self._create_chunk_prompt(name, label, text) for label, text in chunks]
+        with get_metrics().span("llm.map_reduce", kind="profile"):
+            return self._map_reduce(
+                prompts,
+                lambda notes: self._create_reduce_prompt(header, notes, job_description),
+                max_workers, force_refresh,
+            )
+    
+    def analyze_pool(self, people, job_description=None, max_workers=4, candidate_tokens=1500,
+                     force_refresh=False):
+        """
+        Comparative report over many candidates: each candidate is summarized
+        in parallel (map), then the summaries are compared in one prompt
+        (reduce), merging them in rounds first if they don't fit together.
+        API errors are raised.
+        """
+        prompts = [
+            self._create_candidate_summary_prompt(
+                fit_profile_to_budget(person, candidate_tokens)[0], job_description
+            )
+            for person in people
+        ]
+        with get_metrics().span("llm.map_reduce", kind="pool"):
+            return self._map_reduce(
+                prompts,
+                lambda notes: self._create_pool_reduce_prompt(notes, job_description),
+                max_workers, force_refresh,
+            )
+    
+    def _map_reduce(self, prompts, render_reduce, max_workers, force_refresh):
+        """
+        Run the map prompts in parallel, merge the results in rounds until
+        they fit in one reduce prompt, then run it. Stats (chunks, how many
+        were served from the cache, merge rounds) are left in last_map_reduce_stats.
+        """
+        stats = {"chunks": len(prompts), "cached": 0, "merge_rounds": 0}
+        start = time.perf_counter()
+        notes, stats["cached"] = self._map(prompts, max_workers, force_refresh)
+        
+        # Leave room for the reduce instructions and the answer
+        notes_budget = max(512, self.prompt_token_budget - count_tokens(render_reduce([])) - 500)
+        while len(notes) > 1 and count_tokens("\n\n".join(notes)) > notes_budget:
+            groups = pack_items(notes, notes_budget // 2)
+            if len(groups) == len(notes):
+                # Every note is already too big to pair up; cut them instead
+                share = notes_budget // len(notes)
+                notes = [truncate_to_tokens(note, share) for note in notes]
+                break
+            stats["merge_rounds"] += 1
+            notes, _ = self._map([self._create_merge_prompt(group) for group in groups],
+                                 max_workers, force_refresh)
+        
+        result = self._complete(render_reduce(notes), force_refresh=force_refresh)
+        stats["elapsed"] = time.perf_counter() - start
+        self.last_map_reduce_stats = stats
+        get_metrics().incr("mapreduce.chunks", stats["chunks"])
+        get_metrics().incr("mapreduce.chunks_cached", stats["cached"])
+        return result
+    
+    def _map(self, prompts, max_workers, force_refresh):
+        """
+        Complete every prompt on a thread pool, keeping their order.
+        Returns the answers and how many of them came from the cache.
+        """
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="map") as executor:
+            results = list(executor.map(lambda p: self._complete_with_status(p, force_refresh=force_refresh), prompts))
+        return [content for content, _ in results], sum(1 for _, cached in results if cached)
+    
+    def stream_job_fit(self, job_description, filename="person_data.json", force_refresh=False):
+        """
+        Streaming version of analyze_job_fit that yields tokens as they arrive
+        """
+        person = self._load_person(filename)
+        if not person:
+            yield "Unable to load person data."
+            return
         
-        # Handle list format from CrustData API
-        if isinstance(person_data, list) and len(person_data) > 0:
-            person = person_data[0]  # Get the first person
-        else:
-            person = person_data
+        prompt = self._create_job_fit_prompt(person, job_description)
+        yield from self._stream_prompt(prompt, person=person, force_refresh=force_refresh)
+    
+    def stream_general_analysis(self, filename="person_data.json", force_refresh=False):
+        """
+        Streaming version of general_analysis that yields tokens as they arrive
+        """
+        person = self._load_person(filename)
+        if not person:
+            yield "Unable to load person data."
+            return
         
         prompt = self._create_general_prompt(person)
+        yield from self._stream_prompt(prompt, person=person, force_refresh=force_refresh)
+    
+    def stream_chat(self, messages, cache_key=None):
+        """
+        Stream a chat completion, yielding content tokens as they arrive.
+        Time to first token and total generation time are left in self.last_timing.
+        """
+        start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        
+        # Ask for the final usage chunk so streamed calls count toward token metrics
+        stream = self.create_completion(messages, stream=True, stream_options={"include_usage": True})
+        for chunk in stream:
+            _record_usage(getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(token)
+                yield token
+        
+        self.last_timing = self._timing(start, first_token_at)
+        text = "".join(parts)
+        get_metrics().observe("llm.response_bytes", len(text.encode("utf-8")))
+        if cache_key is not None and parts:
+            self.cache.set(cache_key, text)
+    
+    async def astream_chat(self, messages):
+        """
+        Async variant of stream_chat for use inside an event loop
+        """
+        start = time.perf_counter()
+        first_token_at = None
         
-        try:
-            completion = self.client.chat.completions.create(
-                model="Llama-4-Maverick-17B-128E-Instruct-FP8",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
+        stream = await self.acreate_completion(messages, stream=True, stream_options={"include_usage": True})
+        async for chunk in stream:
+            _record_usage(getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                yield token
+        
+        self.last_timing = self._timing(start, first_token_at)
+    
+    def _stream_prompt(self, prompt, person=None, force_refresh=False):
+        """
+        Stream a single-message prompt, replaying cached answers in one chunk
+        and sharing the upstream stream with identical requests in flight
+        """
+        messages = self._user_message(prompt)
+        key = self._cache_key(messages, person)
+        cached = self._cached_response(key, force_refresh)
+        if cached is not None:
+            self.last_timing = {"time_to_first_token": 0.0, "total_time": 0.0, "cached": True}
+            yield cached
+            return
+        
+        # Identical concurrent streams share one upstream call
+        self.last_timing = None
+        start = time.perf_counter()
+        first_token_at = None
+        for token in get_single_flight("llm").stream(self._request_key(messages, person),
+                                                     lambda: self.stream_chat(messages, cache_key=key)):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield token
+        if self.last_timing is None:
+            # Followed another request's stream; stream_chat didn't run here
+            end = time.perf_counter()
+            self.last_timing = {"time_to_first_token": (first_token_at or end) - start,
+                                "total_time": end - start, "cached": False, "coalesced": True}
+    
+    def _timing(self, start, first_token_at):
+        end = time.perf_counter()
+        metrics = get_metrics()
+        metrics.observe("llm.time_to_first_token.seconds", (first_token_at or end) - start)
+        metrics.observe("llm.generation.seconds", end - (first_token_at or end))
+        return {
+            "time_to_first_token": (first_token_at or end) - start,
+            "total_time": end - start,
+            "cached": False,
+        }
+    
+    def _user_message(self, prompt):
+        return [
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ]
+    
+    def _cached_response(self, key, force_refresh=False):
+        """Response cache lookup that also counts hits and misses"""
+        if key is None or force_refresh:
+            return None
+        cached = self.cache.get(key)
+        get_metrics().incr("cache.hit" if cached is not None else "cache.miss", cache="llm")
+        return cached
+    
+    def _cache_key(self, messages, person=None):
+        """
+        Cache key covering the model, messages, sampling params and the person record
+        """
+        if self.cache is None:
+            return None
+        return self._request_key(messages, person)
+    
+    def _request_key(self, messages, person=None):
+        """Hash of everything that determines a response; also keys request coalescing"""
+        fingerprint = person_fingerprint(person) if person is not None else None
+        return make_cache_key(self.model, messages, self.sampling_params, fingerprint)
+    
+    def analysis_prompt(self, person, job_description=None):
+        """
+        The prompt analyze_candidate (with a job description) or analyze_person
+        sends for `person`, so a pipeline can condense and render it in an
+        earlier stage and pass it back in as `prompt`
+        """
+        if job_description:
+            return self._create_job_fit_prompt(person, job_description)
+        return self._create_general_prompt(person)
+    
+    async def aanalyze_candidate(self, person, job_description, force_refresh=False, prompt=None):
+        """
+        Async version of analyze_candidate; `prompt` is an already rendered analysis_prompt()
+        """
+        prompt = prompt or self._create_job_fit_prompt(person, job_description)
+        return await self._acomplete(prompt, person=person, force_refresh=force_refresh)
+    
+    async def aanalyze_person(self, person, force_refresh=False, prompt=None):
+        """
+        Async version of analyze_person; `prompt` is an already rendered analysis_prompt()
+        """
+        prompt = prompt or self._create_general_prompt(person)
+        return await self._acomplete(prompt, person=person, force_refresh=force_refresh)
+    
+    async def _acomplete(self, prompt, person=None, force_refresh=False):
+        """
+        Async version of _complete, sharing the same response cache
+        """
+        messages = self._user_message(prompt)
+        key = self._cache_key(messages, person)
+        cached = self._cached_response(key, force_refresh)
+        if cached is not None:
+            return cached
+        
+        async def request():
+            completion = await self.acreate_completion(messages)
+            content = completion.choices[0].message.content
+            get_metrics().observe("llm.response_bytes", len((content or "").encode("utf-8")))
+            if key is not None and content:
+                self.cache.set(key, content)
+            return content
+        
+        return await get_single_flight("llm").ado(self._request_key(messages, person), request)
+    
+    def _complete(self, prompt, person=None, force_refresh=False):
+        """
+        Send a single-message prompt to Llama, serving repeats from the response cache.
+        """
+        return self._complete_with_status(prompt, person, force_refresh)[0]
+    
+    def _complete_with_status(self, prompt, person=None, force_refresh=False):
+        """
+        _complete that also reports whether the answer came from the cache
+        """
+        messages = self._user_message(prompt)
+        key = self._cache_key(messages, person)
+        cached = self._cached_response(key, force_refresh)
+        if cached is not None:
+            return cached, True
+        
+        def request():
+            completion = self.create_completion(messages)
+            content = completion.choices[0].message.content
+            get_metrics().observe("llm.response_bytes", len((content or "").encode("utf-8")))
+            if key is not None and content:
+                self.cache.set(key, content)
+            return content
+        
+        # Identical prompts already in flight (another session, another worker) share one call
+        return get_single_flight("llm").do(self._request_key(messages, person), request), False
+    
+    def create_completion(self, messages, **kwargs):
+        """
+        Chat completion request through the shared transport, which retries
+        rate limits, 5xx and connection errors and trips the circuit breaker
+        when the Llama API keeps failing. With stream=True only opening the
+        stream is retried.
+        """
+        metrics = get_metrics()
+        metrics.observe("llm.request_bytes", _payload_bytes(messages))
+        with metrics.span("llm.request", stream=bool(kwargs.get("stream"))):
+            completion = get_transport().call(
+                lambda: self.client.chat.completions.create(
+                    model=self.model, messages=messages, **self.sampling_params, **kwargs
+                ),
+                "llama.chat",
+                is_retryable=_is_retryable_llm_error,
+                retry_after=_llm_retry_after,
             )
-            return completion.choices[0].message.content
-        except Exception as e:
-            return f"Error processing with Llama API: {str(e)}"
+        _record_usage(getattr(completion, "usage", None))
+        return completion
+    
+    async def acreate_completion(self, messages, **kwargs):
+        """
+        Async version of create_completion
+        """
+        metrics = get_metrics()
+        metrics.observe("llm.request_bytes", _payload_bytes(messages))
+        with metrics.span("llm.request", stream=bool(kwargs.get("stream"))):
+            completion = await get_transport().acall(
+                lambda: self.async_client.chat.completions.create(
+                    model=self.model, messages=messages, **self.sampling_params, **kwargs
+                ),
+                "llama.chat",
+                is_retryable=_is_retryable_llm_error,
+                retry_after=_llm_retry_after,
+            )
+        _record_usage(getattr(completion, "usage", None))
+        return completion
     
     def simple_chat(self, filename="person_data.json"):
         """
         Simple chat interface to ask questions about the person data
         """
-        person_data = self.load_person_data(filename)
-        if not person_data:
+        person = self._load_person(filename)
+        if not person:
             return "Unable to load person data."
         
-        # Handle list format from CrustData API
-        if isinstance(person_data, list) and len(person_data) > 0:
-            person = person_data[0]  # Get the first person
-        else:
-            person = person_data
+        session = ChatSession(person, self)
         
         print("\n🤖 Simple Chat Mode - Ask me anything about the person data!")
+        print(format_budget_stats(session.profile_stats))
         print("Type 'quit' to exit.\n")
         
         while True:
@@ -115,36 +570,17 @@ class LlamaProcessor:
             if not user_question:
                 continue
             
-            # Create a simple prompt with the person data and user question
-            prompt = f"""
-            Based on the following person data, please answer the user's question:
-
-            Person Data:
-            {json.dumps(person, indent=2)}
-
-            User Question: {user_question}
-
-            Please provide a helpful and accurate answer based on the data above.
-            """
-            
             try:
-                completion = self.client.chat.completions.create(
-                    model="Llama-4-Maverick-17B-128E-Instruct-FP8",
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt,
-                        }
-                    ],
-                )
-                response = completion.choices[0].message.content
-                print(f"\n🤖 Assistant: {response}\n")
+                print("\n🤖 Assistant: ", end="", flush=True)
+                print_stream(session.stream(user_question), self)
             except Exception as e:
                 print(f"❌ Error: {str(e)}\n")
 
-    def _create_job_fit_prompt(self, person_data, job_description):
+    @timed("llm.prompt_build", kind="job_fit")
+    def _create_job_fit_prompt(self, person_data, job_description, structured=False):
         """
-        Create a prompt to analyze job fit
+        Create a prompt to analyze job fit, asking for the numbered markdown
+        sections or, with structured=True, a JSON object matching JOB_FIT_SCHEMA
         """
         name = person_data.get('name', 'Unknown')
         current_title = person_data.get('current_position_title', 'Unknown')
@@ -181,24 +617,12 @@ class LlamaProcessor:
         JOB DESCRIPTION:
         {job_description}
         
-        ANALYSIS REQUEST:
-        Please analyze if this candidate is a good fit for the job described above. Provide:
-        
-        1. **FIT SCORE** (1-10): Rate how well this candidate matches the job requirements
-        
-        2. **STRENGTHS**: What makes this candidate a good fit? List specific experiences, skills, or qualifications that align with the job.
-        
-        3. **GAPS**: What are the potential gaps or concerns? What might the candidate lack for this role?
-        
-        4. **RECOMMENDATION**: Should we proceed with this candidate? Why or why not?
-        
-        5. **NEXT STEPS**: If moving forward, what questions should we ask in an interview to validate fit?
-        
-        Format your response clearly with the numbered sections above.
-        """
+        {_STRUCTURED_JOB_FIT_REQUEST if structured else _JOB_FIT_REQUEST}"""
         
-        return prompt
+        return self._guard_prompt(prompt, job_description)
+
     
+    @timed("llm.prompt_build", kind="general")
     def _create_general_prompt(self, person_data):
         """
         Create a general analysis prompt
@@ -207,14 +631,15 @@ class LlamaProcessor:
         current_title = person_data.get('current_position_title', 'Unknown')
         current_company = person_data.get('current_company_name', 'Unknown')
         
-        prompt = f"""
+        def render(profile_json):
+            return f"""
         PROFESSIONAL PROFILE ANALYSIS
         
         Candidate: {name}
         Current Role: {current_title} at {current_company}
         
         Full Profile Data:
-        {json.dumps(person_data, indent=2)}
+        {profile_json}
         
         Please provide a comprehensive professional analysis including:
         
@@ -228,7 +653,214 @@ class LlamaProcessor:
         Format your response in a clear, structured way.
         """
         
+        return self._render_with_profile(render, person_data)
+    
+    @timed("llm.prompt_build", kind="focus")
+    def _create_focus_prompt(self, person_data, focus):
+        """
+        Create a prompt for a targeted analysis
+        """
+        instructions = ANALYSIS_FOCUS.get(focus, ANALYSIS_FOCUS["overall"])
+        
+        def render(profile_json):
+            return f"""
+        Based on the following person's profile:
+        
+        {profile_json}
+        
+        {instructions}
+        
+        Please provide detailed insights, specific examples from their profile, and actionable recommendations.
+        """
+        
+        return self._render_with_profile(render, person_data)
+    
+    def _create_chunk_prompt(self, name, label, chunk_json):
+        """
+        Map prompt: summarize one section of a profile
+        """
+        return f"""
+        Summarize this part ({label}) of {name}'s professional profile in 3-6 concise bullet points.
+        Keep job titles, employers, dates, degrees and concrete achievements; skip filler.
+        
+        {chunk_json}
+        """
+    
+    def _create_merge_prompt(self, notes):
+        """
+        Intermediate reduce prompt: condense several summaries into one
+        """
+        joined = "\n\n".join(notes)
+        return f"""
+        Merge these notes into one concise set of bullet points without losing
+        titles, employers, dates, scores or concrete achievements:
+        
+        {joined}
+        """
+    
+    def _create_reduce_prompt(self, header_json, notes, job_description=None):
+        """
+        Final reduce prompt for a single profile: general or job fit analysis
+        """
+        joined = "\n\n".join(notes)
+        if job_description:
+            request = """Please analyze if this candidate is a good fit for the job described below. Provide:
+        
+        1. **FIT SCORE** (1-10): Rate how well this candidate matches the job requirements
+        2. **STRENGTHS**: What makes this candidate a good fit?
+        3. **GAPS**: What are the potential gaps or concerns?
+        4. **RECOMMENDATION**: Should we proceed with this candidate? Why or why not?
+        5. **NEXT STEPS**: What questions should we ask in an interview to validate fit?
+        
+        JOB DESCRIPTION:
+        """ + job_description
+        else:
+            request = """Please provide a comprehensive professional analysis including:
+        
+        1. **Professional Summary**: Brief overview of their career
+        2. **Key Strengths**: Core skills and expertise areas
+        3. **Career Progression**: How their career has evolved
+        4. **Industry Focus**: What industries/domains they specialize in
+        5. **Unique Value**: What makes them stand out
+        6. **Potential Opportunities**: Types of roles they'd be good for"""
+        return f"""
+        PROFESSIONAL PROFILE ANALYSIS
+        
+        Candidate: {header_json}
+        
+        Section summaries of the full profile:
+        {joined}
+        
+        {request}
+        
+        Format your response clearly with the numbered sections above.
+        """
+    
+    def _create_candidate_summary_prompt(self, profile_json, job_description=None):
+        """
+        Map prompt for a candidate pool: one short summary per candidate
+        """
+        focus = ("with respect to this job:\n        " + job_description) if job_description else "for a recruiter"
+        return f"""
+        Summarize this candidate in 4-6 bullet points {focus}
+        
+        Start with their name and current role, and include a 1-10 fit score if a job is given.
+        
+        {profile_json}
+        """
+    
+    def _create_pool_reduce_prompt(self, notes, job_description=None):
+        """
+        Final reduce prompt comparing a pool of candidates
+        """
+        joined = "\n\n".join(notes)
+        job = f"\n        JOB DESCRIPTION:\n        {job_description}\n" if job_description else ""
+        return f"""
+        CANDIDATE POOL REPORT
+        {job}
+        Candidate summaries:
+        {joined}
+        
+        Please provide:
+        
+        1. **Shortlist**: The strongest candidates, best first, with one line on why
+        2. **Common Strengths**: What the pool does well overall
+        3. **Common Gaps**: Skills or experience the pool is missing
+        4. **Recommendation**: Who to contact first and what to ask them
+        
+        Format your response clearly with the numbered sections above.
+        """
+    
+    def _render_with_profile(self, render, person_data):
+        """
+        Render a prompt around the person's profile, trimming the profile so
+        the whole prompt stays within prompt_token_budget
+        """
+        overhead = count_tokens(render(""))
+        profile_json, self.last_profile_stats = fit_profile_to_budget(
+            person_data, max(256, self.prompt_token_budget - overhead)
+        )
+        prompt = render(profile_json)
+        self._record_prompt_stats(
+            self.last_profile_stats["original_tokens"] + overhead, count_tokens(prompt),
+            self.last_profile_stats["truncated"],
+        )
         return prompt
+    
+    def _guard_prompt(self, prompt, job_description):
+        """
+        Keep a job fit prompt within budget by cutting the job description,
+        the only unbounded part of it
+        """
+        tokens = count_tokens(prompt)
+        truncated = {}
+        if tokens > self.prompt_token_budget:
+            jd_tokens = count_tokens(job_description)
+            trimmed = truncate_to_tokens(job_description, max(64, jd_tokens - (tokens - self.prompt_token_budget)))
+            prompt = prompt.replace(job_description, trimmed)
+            truncated["job_description"] = [jd_tokens, count_tokens(trimmed)]
+        self._record_prompt_stats(tokens, count_tokens(prompt) if truncated else tokens, truncated)
+        return prompt
+    
+    def _record_prompt_stats(self, tokens_before, tokens_after, truncated):
+        """Keep before/after prompt sizes in last_prompt_stats and the metrics registry"""
+        self.last_prompt_stats = {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "budget": self.prompt_token_budget,
+            "truncated": truncated,
+        }
+        metrics = get_metrics()
+        metrics.observe("prompt.tokens_before", tokens_before)
+        metrics.observe("prompt.tokens_after", tokens_after)
+        if truncated:
+            metrics.incr("prompt.truncated")
+
+def _is_retryable_llm_error(exc):
+    # Any error raised by the SDK means it is already imported
+    import openai
+    if isinstance(exc, openai.APIConnectionError):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code in RETRY_STATUSES
+
+def _payload_bytes(messages):
+    return len(json.dumps(messages, ensure_ascii=False).encode("utf-8"))
+
+def _record_usage(usage):
+    """Prompt/completion token counts reported by the API, when present"""
+    if usage is None:
+        return
+    metrics = get_metrics()
+    for field in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, field, None)
+        if value is not None:
+            metrics.observe(f"llm.{field}", value)
+
+def _llm_retry_after(exc):
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    return parse_retry_after(response.headers.get("retry-after"))
+
+def format_timing(timing):
+    """
+    One-line summary of a streaming call's latency
+    """
+    if not timing:
+        return ""
+    if timing.get("cached"):
+        return "⚡ Served from cache"
+    if timing.get("coalesced"):
+        return f"🔗 Shared with an identical request in flight · total {timing['total_time']:.2f}s"
+    return f"⏱️ First token {timing['time_to_first_token']:.2f}s · total {timing['total_time']:.2f}s"
+
+def print_stream(tokens, processor):
+    """
+    Print streamed tokens as they arrive, followed by the call's timing
+    """
+    for token in tokens:
+        print(token, end="", flush=True)
+    print(f"\n\n{format_timing(processor.last_timing)}\n")
 
 def main():
     """
@@ -256,21 +888,25 @@ def main():
         
         if job_description.strip():
             print("\n🤖 Analyzing job fit...")
-            result = processor.analyze_job_fit(job_description)
             print("\n" + "="*50)
             print("JOB FIT ANALYSIS RESULTS")
             print("="*50)
-            print(result)
+            try:
+                print_stream(processor.stream_job_fit(job_description), processor)
+            except Exception as e:
+                print(f"Error processing with Llama API: {str(e)}")
         else:
             print("❌ Job description cannot be empty.")
     
     elif choice == "2":
         print("\n🤖 Performing general analysis...")
-        result = processor.general_analysis()
         print("\n" + "="*50)
         print("PROFESSIONAL ANALYSIS RESULTS")
         print("="*50)
-        print(result)
+        try:
+            print_stream(processor.stream_general_analysis(), processor)
+        except Exception as e:
+            print(f"Error processing with Llama API: {str(e)}")
     
     elif choice == "3":
         processor.simple_chat()
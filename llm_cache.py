@@ -0,0 +1,176 @@
+"""
+Response cache for Llama completions.
+
+Keys are a hash of the model name, the rendered messages, the sampling
+parameters and a fingerprint of the person record the prompt was built from,
+so a cached answer is reused only for the exact same request and goes stale
+as soon as the underlying profile changes.
+
+Backends share a tiny get/set/stats interface so they can be swapped or
+stacked: an in-memory LRU for the hot path and an optional SQLite store that
+survives restarts.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+def person_fingerprint(person):
+    """Stable hash of a person record, used to invalidate answers when the profile changes"""
+    canonical = json.dumps(person, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def make_cache_key(model, messages, sampling_params=None, fingerprint=None):
+    """Hash everything that can change a completion into a single cache key"""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "params": sampling_params or {},
+        "person": fingerprint,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class LRUResponseCache:
+    """
+    Thread-safe in-memory LRU cache of completion text
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+class SQLiteResponseCache:
+    """
+    Persistent completion cache stored in SQLite, trimmed by least recent use
+    """
+    def __init__(self, path="llm_cache.db", max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, last_access) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+class TieredResponseCache:
+    """
+    In-memory LRU in front of an optional persistent backend.
+    Persistent hits are promoted into memory.
+    """
+    def __init__(self, memory=None, persistent=None):
+        self.memory = memory or LRUResponseCache()
+        self.persistent = persistent
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self):
+        stats = {"memory": self.memory.stats()}
+        if self.persistent is not None:
+            stats["persistent"] = self.persistent.stats()
+        return stats
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """
+    Return the process-wide response cache. LLM_CACHE_SIZE sets the in-memory
+    LRU size; setting LLM_CACHE_PATH adds a persistent SQLite backend.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            persistent_path = os.getenv("LLM_CACHE_PATH")
+            _default_cache = TieredResponseCache(
+                memory=LRUResponseCache(int(os.getenv("LLM_CACHE_SIZE", 256))),
+                persistent=SQLiteResponseCache(persistent_path) if persistent_path else None,
+            )
+        return _default_cache
@@ -6,60 +6,80 @@ This script orchestrates the two-step process:
 1. Fetch person data from CrustData API
 2. Analyze the data using Llama AI
 
+Both steps run in this process (see pipeline.py), so there is no extra
+interpreter startup between them.
+
 Usage:
     python main.py [linkedin_url]
+    python main.py [linkedin_url] --general
+    python main.py [linkedin_url] --job job.txt
+    python main.py [linkedin_url] --general --map-reduce
 """
 
-import subprocess
 import sys
-import os
+import time
+import argparse
 
-def run_crustdata(linkedin_url=None):
-    """Run crustdata.py to fetch person data"""
-    print("🔍 Step 1: Fetching person data from CrustData...")
-    
-    if linkedin_url:
-        result = subprocess.run([sys.executable, "crustdata.py", linkedin_url], 
-                              capture_output=True, text=True)
-    else:
-        result = subprocess.run([sys.executable, "crustdata.py"], 
-                              capture_output=True, text=True)
-    
-    print(result.stdout)
-    if result.stderr:
-        print("Errors:", result.stderr)
-    
-    return result.returncode == 0
+import llama_client
+from pipeline import StageTimer, fetch_profile, run_pipeline, format_timings
 
-def run_llama_analysis():
-    """Run llama_client.py to analyze the data"""
-    print("\n🤖 Step 2: Analyzing data with Llama AI...")
-    
-    # Check if data file exists
-    if not os.path.exists("person_data.json"):
-        print("❌ No person data found. Step 1 (CrustData fetch) must have failed.")
-        return False
-    
-    result = subprocess.run([sys.executable, "llama_client.py"], 
-                          capture_output=False, text=True)
-    
-    return result.returncode == 0
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch a LinkedIn profile and analyze it with Llama AI")
+    parser.add_argument("linkedin_url", nargs="?", help="LinkedIn profile URL to analyze")
+    parser.add_argument("--job", metavar="FILE", help="Run a job fit analysis against this job description")
+    parser.add_argument("--general", action="store_true", help="Run a general professional analysis")
+    parser.add_argument("--map-reduce", action="store_true",
+                        help="Summarize the profile section by section before analyzing (for long profiles)")
+    parser.add_argument("--force-refresh", action="store_true", help="Ignore the enrichment cache")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
     """Main function to run the complete workflow"""
     print("=== PERSON ANALYSIS WORKFLOW ===\n")
-    
-    # Get LinkedIn URL from command line argument if provided
-    linkedin_url = sys.argv[1] if len(sys.argv) > 1 else None
-    
+    args = parse_args(argv)
+
+    # Non-interactive: fetch and analyze in one go
+    if args.job or args.general:
+        job_description = None
+        if args.job:
+            with open(args.job, 'r', encoding='utf-8') as f:
+                job_description = f.read()
+        print("🔍 Fetching and analyzing profile...")
+        try:
+            result = run_pipeline(args.linkedin_url, job_description=job_description,
+                                  force_refresh=args.force_refresh, map_reduce=args.map_reduce)
+        except Exception as e:
+            print(f"❌ Workflow failed: {e}")
+            return 1
+        person = result["person"]
+        print(f"👤 {person.get('name', 'Unknown')} - {person.get('current_position_title', 'Unknown')} at {person.get('current_company_name', 'Unknown')}")
+        print("\n" + "="*50)
+        print("JOB FIT ANALYSIS RESULTS" if job_description else "PROFESSIONAL ANALYSIS RESULTS")
+        print("="*50)
+        print(result["analysis"])
+        print(f"\n{format_timings(result['timings'])}")
+        return 0
+
     # Step 1: Fetch data
-    if run_crustdata(linkedin_url):
-        print("✅ Data fetch completed successfully!")
-        
-        # Step 2: Analyze data
-        run_llama_analysis()
-    else:
+    print("🔍 Step 1: Fetching person data from CrustData...")
+    timer = StageTimer()
+    try:
+        with timer.stage("fetch"):
+            person = fetch_profile(args.linkedin_url, force_refresh=args.force_refresh)
+    except Exception as e:
+        print(f"Error: {e}")
         print("❌ Data fetch failed. Please check your API credentials and try again.")
+        return 1
+    print(f"✅ Data fetch completed successfully! ({timer.timings['fetch']:.2f}s)")
+    print(f"👤 Name: {person.get('name', 'Unknown')}")
+
+    # Step 2: Analyze data interactively
+    print("\n🤖 Step 2: Analyzing data with Llama AI...")
+    start = time.perf_counter()
+    llama_client.main()
+    timer.timings["analyze"] = time.perf_counter() - start
+    print(format_timings(timer.timings))
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+In-process metrics for the enrichment and LLM hot paths.
+
+Code records timing spans, sizes and counters against a process-wide
+registry:
+
+    with get_metrics().span("crustdata.fetch"):
+        ...
+    get_metrics().observe("llm.prompt_tokens", 812, kind="job_fit")
+    get_metrics().incr("cache.hit", cache="llm")
+
+The registry keeps a rolling window per series for p50/p95/p99 and running
+totals for counters. Every event is also handed to the registered sinks, so
+the same data can go to structured JSON logs, the Prometheus text endpoint
+or the Streamlit diagnostics panel.
+
+Settings come from the environment:
+    METRICS_LOG     write one JSON event per line to this file ("-" for stderr)
+    METRICS_PORT    serve Prometheus text on http://127.0.0.1:<port>/metrics
+"""
+
+import os
+import sys
+import json
+import time
+import functools
+import threading
+from collections import deque
+
+DEFAULT_WINDOW = 2048
+
+def _series_key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list, or None when empty"""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+class _Span:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels)
+        if exc_type is not None:
+            labels["error"] = exc_type.__name__
+        self.registry.observe(self.name + ".seconds", time.perf_counter() - self.start, **labels)
+        return False
+
+def timed(name, **labels):
+    """Decorator recording each call of the function as a span on the default registry"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_metrics().span(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class MetricsRegistry:
+    """
+    Thread-safe store of observations (spans, sizes, token counts) and counters
+    """
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._observations = {}
+        self._totals = {}
+        self._counters = {}
+        self._sinks = []
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        """Register a callable that receives every event dict"""
+        with self._lock:
+            self._sinks.append(sink)
+
+    def span(self, name, **labels):
+        """Context manager recording the block's wall time as `<name>.seconds`"""
+        return _Span(self, name, labels)
+
+    def observe(self, name, value, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            values = self._observations.get(key)
+            if values is None:
+                values = self._observations[key] = deque(maxlen=self.window)
+            values.append(value)
+            count, total = self._totals.get(key, (0, 0.0))
+            self._totals[key] = (count + 1, total + value)
+            sinks = list(self._sinks)
+        self._emit(sinks, {"type": "observation", "name": name, "value": value, "labels": labels})
+
+    def incr(self, name, amount=1, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            sinks = list(self._sinks)
+        self._emit(sinks, {"type": "counter", "name": name, "value": amount, "labels": labels})
+
+    def snapshot(self):
+        """
+        {"observations": [...], "counters": [...]} with count, sum and
+        p50/p95/p99 over the rolling window for each observed series
+        """
+        with self._lock:
+            observations = {key: sorted(values) for key, values in self._observations.items()}
+            totals = dict(self._totals)
+            counters = dict(self._counters)
+
+        series = []
+        for (name, labels), values in sorted(observations.items()):
+            count, total = totals[(name, labels)]
+            series.append({
+                "name": name,
+                "labels": dict(labels),
+                "count": count,
+                "sum": total,
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            })
+        return {
+            "observations": series,
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._observations.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+    def _emit(self, sinks, event):
+        if not sinks:
+            return
+        event["ts"] = time.time()
+        for sink in sinks:
+            try:
+                sink(event)
+            except Exception:
+                # A broken sink must never fail the call being measured
+                pass
+
+class JsonLogSink:
+    """
+    Writes each metrics event as one JSON line (to a file, or stderr)
+    """
+    def __init__(self, path=None):
+        self.file = open(path, 'a', encoding='utf-8') if path and path != "-" else sys.stderr
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stderr:
+            self.file.close()
+
+def _prom_name(name):
+    return "vibe_" + "".join(c if c.isalnum() else "_" for c in name)
+
+def _prom_escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_prom_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+def render_prometheus(registry=None, transport_metrics=None):
+    """
+    Prometheus text exposition of the registry: observations as summaries
+    (quantiles over the rolling window plus _count/_sum), counters as counters,
+    and per-endpoint transport stats when given
+    """
+    snapshot = (registry or get_metrics()).snapshot()
+    lines = []
+    seen = set()
+    for s in snapshot["observations"]:
+        name = _prom_name(s["name"])
+        if name not in seen:
+            lines.append(f"# TYPE {name} summary")
+            seen.add(name)
+        for q in (50, 95, 99):
+            value = s[f"p{q}"]
+            if value is not None:
+                lines.append(f"{name}{_prom_labels({**s['labels'], 'quantile': q / 100})} {value}")
+        lines.append(f"{name}_count{_prom_labels(s['labels'])} {s['count']}")
+        lines.append(f"{name}_sum{_prom_labels(s['labels'])} {s['sum']}")
+    for c in snapshot["counters"]:
+        name = _prom_name(c["name"]) + "_total"
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_prom_labels(c['labels'])} {c['value']}")
+    for endpoint, m in (transport_metrics or {}).items():
+        labels = _prom_labels({"endpoint": endpoint})
+        for field in ("requests", "errors", "retries"):
+            lines.append(f"vibe_http_{field}_total{labels} {m[field]}")
+        lines.append(f"vibe_http_circuit_open{labels} {int(m['circuit'] == 'open')}")
+    return "\n".join(lines) + "\n"
+
+def serve_metrics(port, host="127.0.0.1"):
+    """
+    Serve GET /metrics in Prometheus text format on a daemon thread.
+    Returns the server so callers can shut it down.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from http_transport import get_transport
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            data = render_prometheus(transport_metrics=get_transport().metrics()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
+
+def format_snapshot(snapshot):
+    """Human-readable summary lines for a registry snapshot"""
+    lines = []
+    for s in snapshot["observations"]:
+        labels = " ".join(f"{k}={v}" for k, v in s["labels"].items())
+        scale, unit = (1000, "ms") if s["name"].endswith(".seconds") else (1, "")
+        quantiles = " ".join(f"p{q} {s[f'p{q}'] * scale:.0f}{unit}" for q in (50, 95, 99))
+        lines.append(f"📈 {s['name']} {labels}".rstrip() + f": n={s['count']} {quantiles}")
+    for c in snapshot["counters"]:
+        labels = " ".join(f"{k}={v}" for k, v in c["labels"].items())
+        lines.append(f"🔢 {c['name']} {labels}".rstrip() + f": {c['value']}")
+    return "\n".join(lines)
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+def get_metrics():
+    """
+    Return the process-wide registry, wiring up the JSON log sink and the
+    Prometheus endpoint from METRICS_LOG / METRICS_PORT on first use
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            registry = MetricsRegistry()
+            log_path = os.getenv("METRICS_LOG")
+            if log_path:
+                registry.add_sink(JsonLogSink(log_path))
+            _default_registry = registry
+            port = os.getenv("METRICS_PORT")
+            if port:
+                try:
+                    serve_metrics(int(port))
+                except OSError as e:
+                    print(f"⚠️ Metrics endpoint not started on port {port}: {e}", file=sys.stderr)
+        return _default_registry
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the CrustData and Llama APIs, for benchmarks and offline runs.
+
+    GET  /screener/person/enrich          CrustData-shaped person records
+    POST /compat/v1/chat/completions      OpenAI-compatible chat completions,
+                                          including SSE streaming
+
+Latency, error rate and payload size are configurable per server. Errors are
+returned as 503s, or 429s with a Retry-After header, so the retry path in
+http_transport gets exercised too.
+
+Usage:
+    python mock_servers.py --crustdata-port 8701 --llama-port 8702 --latency 0.2 --error-rate 0.05
+    CRUSTDATA_BASE_URL=http://127.0.0.1:8701 LLAMA_BASE_URL=http://127.0.0.1:8702/compat/v1/ python crustdata.py
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = """1. **Overall Fit Assessment**: Strong match for the role's core requirements.
+2. **Strengths**: Relevant experience, steady career progression, solid fundamentals.
+3. **Gaps**: Limited exposure to some of the listed tools.
+4. **Recommendations**: Proceed to a technical screen.
+5. **Fit Score**: FIT SCORE: 7/10"""
+
+class MockConfig:
+    """
+    Behaviour knobs for a mock server
+    """
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 payload_size=8000, token_delay=0.005, answer_tokens=120):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.payload_size = payload_size
+        self.token_delay = token_delay
+        self.answer_tokens = answer_tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def failure(self):
+        """None, or (status, headers) for a simulated upstream failure"""
+        with self._lock:
+            self.requests += 1
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return 429, {"Retry-After": "0"}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503, {}
+        return None
+
+def mock_person(profile_url, payload_size=8000):
+    """A CrustData-shaped person record padded to roughly `payload_size` bytes of JSON"""
+    match = re.search(r"/in/([^/?#]+)", profile_url or "")
+    slug = match.group(1) if match else "candidate"
+    rng = random.Random(slug)
+    person = {
+        "name": slug.replace("-", " ").title(),
+        "linkedin_profile_url": profile_url,
+        "current_position_title": rng.choice(["Software Engineer", "Senior Engineer", "Data Scientist", "Product Manager"]),
+        "current_company_name": rng.choice(["Acme", "Globex", "Initech", "Umbrella"]),
+        "location": "San Francisco, California, United States",
+        "headline": "Building things that scale",
+        "summary": "Engineer with experience across backend systems, data pipelines and ML infrastructure.",
+        "skills": ["Python", "Go", "Kubernetes", "PostgreSQL", "Machine Learning", "AWS"],
+        "education_background": [
+            {"institute_name": "State University", "degree_name": "BS", "field_of_study": "Computer Science"},
+        ],
+        "work_experience": [],
+    }
+    size = len(json.dumps(person))
+    index = 0
+    while size < payload_size:
+        role = {
+            "employer_name": f"Company {index}",
+            "employee_title": rng.choice(["Engineer", "Senior Engineer", "Staff Engineer", "Tech Lead"]),
+            "start_date": f"{2024 - 2 * index}-01-01",
+            "end_date": f"{2025 - 2 * index}-12-31" if index else None,
+            "description": "Led projects across services, mentoring and on-call. " * 3,
+            "employer_linkedin_id": str(rng.randrange(10 ** 8)),
+        }
+        person["work_experience"].append(role)
+        size += len(json.dumps(role))
+        index += 1
+    return person
+
+def _completion(model, content, prompt_tokens):
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content.split()),
+            "total_tokens": prompt_tokens + len(content.split()),
+        },
+    }
+
+def _chunk(model, content=None, finish_reason=None, usage=None):
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [] if usage else [{"index": 0, "delta": {"content": content} if content else {}, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+def _answer(config):
+    words = ANSWER.split(" ")
+    # Repeat the canned answer to reach the configured length, keeping the score line last
+    filler = ("Further notes on the candidate's background. " * (config.answer_tokens // 6 + 1)).split(" ")
+    extra = filler[:max(0, config.answer_tokens - len(words))]
+    return " ".join(extra + words) if extra else ANSWER
+
+def _json_answer():
+    """Structured job fit reply for requests that set response_format"""
+    score = random.randint(3, 9)
+    return json.dumps({
+        "fit_score": score,
+        "strengths": ["Relevant experience", "Steady career progression"],
+        "gaps": ["Limited exposure to some of the listed tools"],
+        "recommendation": {"decision": "yes" if score >= 6 else "maybe", "reason": "Matches the core requirements."},
+        "interview_questions": ["Walk us through your most relevant project."],
+    })
+
+def make_handler(crustdata_config=None, llama_config=None):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if crustdata_config is None or parsed.path != "/screener/person/enrich":
+                self._send_json(404, {"error": "Not found"})
+                return
+            crustdata_config.delay()
+            failure = crustdata_config.failure()
+            if failure:
+                self._send_json(failure[0], {"error": "simulated failure"}, failure[1])
+                return
+            profile_url = parse_qs(parsed.query).get("linkedin_profile_url", [""])[0]
+            self._send_json(200, [mock_person(profile_url, crustdata_config.payload_size)])
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            if llama_config is None or not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": "Not found"})
+                return
+            request = json.loads(body or b"{}")
+            model = request.get("model", "mock")
+            prompt_tokens = len(body) // 4
+            llama_config.delay()
+            failure = llama_config.failure()
+            if failure:
+                self._send_json(failure[0], {"error": {"message": "simulated failure"}}, failure[1])
+                return
+            content = _json_answer() if request.get("response_format") else _answer(llama_config)
+            if request.get("stream"):
+                include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+                self._stream(model, content, prompt_tokens, include_usage)
+            else:
+                time.sleep(llama_config.token_delay * len(content.split()))
+                self._send_json(200, _completion(model, content, prompt_tokens))
+
+        def _stream(self, model, content, prompt_tokens, include_usage=False):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            tokens = content.split(" ")
+            for i, token in enumerate(tokens):
+                time.sleep(llama_config.token_delay)
+                self._write_event(_chunk(model, token if i == 0 else " " + token))
+            self._write_event(_chunk(model, finish_reason="stop"))
+            if include_usage:
+                # Like the real API, the usage chunk is only sent when asked for
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                         "total_tokens": prompt_tokens + len(tokens)}
+                self._write_event(_chunk(model, usage=usage))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        def _write_event(self, payload):
+            self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+class MockServer:
+    """
+    A mock API server running on a daemon thread; use as a context manager
+    """
+    def __init__(self, crustdata_config=None, llama_config=None, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), make_handler(crustdata_config, llama_config))
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address[:2]
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True, name=f"mock-{self.port}").start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run mock CrustData and Llama servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--crustdata-port", type=int, default=8701)
+    parser.add_argument("--llama-port", type=int, default=8702)
+    parser.add_argument("--latency", type=float, default=0.05, help="Base response latency in seconds (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± random latency in seconds (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503 (default: 0)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429 (default: 0)")
+    parser.add_argument("--payload-size", type=int, default=8000, help="Approximate profile size in bytes (default: 8000)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Seconds per generated token (default: 0.005)")
+    parser.add_argument("--answer-tokens", type=int, default=120, help="Words per generated answer (default: 120)")
+    args = parser.parse_args(argv)
+
+    def config():
+        return MockConfig(args.latency, args.jitter, args.error_rate, args.rate_limit_rate,
+                          args.payload_size, args.token_delay, args.answer_tokens)
+
+    crustdata = MockServer(crustdata_config=config(), host=args.host, port=args.crustdata_port).start()
+    llama = MockServer(llama_config=config(), host=args.host, port=args.llama_port).start()
+    print(f"🧪 Mock CrustData: {crustdata.url}  (CRUSTDATA_BASE_URL={crustdata.url})")
+    print(f"🧪 Mock Llama:     {llama.url}  (LLAMA_BASE_URL={llama.url}/compat/v1/)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        crustdata.stop()
+        llama.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+In-process fetch → analyze pipeline.
+
+Calls the CrustData fetch and LlamaProcessor directly and hands the person
+record from one stage to the next in memory, instead of spawning a fresh
+interpreter per step and passing data through person_data.json. Each stage
+is timed so slow runs can be attributed to the right step.
+"""
+
+import time
+
+from crustdata import request_person_data, save_person_data, DEFAULT_PROFILE_URL
+from llama_client import LlamaProcessor
+from candidate_store import get_candidate_store, candidate_key
+
+class StageTimer:
+    """
+    Collects wall-clock time per named stage
+    """
+    def __init__(self):
+        self.timings = {}
+
+    def stage(self, name):
+        return _Stage(self.timings, name)
+
+class _Stage:
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings[self.name] = time.perf_counter() - self.start
+        return False
+
+def fetch_profile(linkedin_url=None, force_refresh=False, output_file="person_data.json"):
+    """
+    Fetch one profile and return the person record. The response is saved to
+    the candidate store and to `output_file` (when set) for the tools that
+    still read it.
+    """
+    profile_url = linkedin_url or DEFAULT_PROFILE_URL
+    data = request_person_data(profile_url, force_refresh=force_refresh)
+    if not data:
+        raise RuntimeError("CrustData returned no profile data")
+
+    save_person_data(data, profile_url, output_file)
+    return data[0] if isinstance(data, list) else data
+
+def analyze_profile(person, job_description=None, processor=None, map_reduce=False):
+    """
+    Job fit analysis when a job description is given, general analysis otherwise.
+    map_reduce=True summarizes the profile section by section first (for long profiles).
+    """
+    processor = processor or LlamaProcessor()
+    if map_reduce:
+        return processor.analyze_person_map_reduce(person, job_description)
+    if job_description:
+        return processor.analyze_candidate(person, job_description)
+    return processor.analyze_person(person)
+
+def run_pipeline(linkedin_url=None, job_description=None, processor=None,
+                 force_refresh=False, output_file="person_data.json", map_reduce=False):
+    """
+    Fetch a profile and analyze it in one process.
+    Returns a dict with the person record, the analysis text and per-stage timings.
+    """
+    timer = StageTimer()
+    with timer.stage("fetch"):
+        person = fetch_profile(linkedin_url, force_refresh=force_refresh, output_file=output_file)
+    with timer.stage("analyze"):
+        analysis = analyze_profile(person, job_description, processor=processor, map_reduce=map_reduce)
+    get_candidate_store().save_analysis(
+        candidate_key(person),
+        "job_fit" if job_description else "general", analysis, job_description,
+    )
+    timer.timings["total"] = sum(timer.timings.values())
+    return {"person": person, "analysis": analysis, "timings": timer.timings}
+
+def format_timings(timings):
+    """One-line summary of per-stage timings"""
+    return "⏱️ " + " · ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
@@ -0,0 +1,124 @@
+"""
+Cheap, deterministic pre-filter for job fit scoring.
+
+Before any candidate is sent to Llama, the structured CrustData record
+(titles, employers, education, skills) is scored against the job description
+with BM25, computed over the whole pool at once with NumPy. Candidates short
+of a "N+ years" requirement in the job description are down-weighted. Only
+the top-K move on to the LLM.
+"""
+
+import re
+from datetime import date
+
+import numpy as np
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "of", "on", "or", "our", "that", "the", "this", "to", "we",
+    "with", "you", "your", "will", "who", "looking", "seeking", "required",
+    "preferred", "experience", "years", "year", "plus", "strong", "not", "but",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+YEARS_PATTERN = re.compile(r"(\d+)\s*\+?\s*years?", re.IGNORECASE)
+
+def tokenize(text):
+    """Lowercase word tokens, keeping tech terms like c++, c#, node.js"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+def candidate_text(person):
+    """
+    Flatten the fields that matter for matching into one string
+    """
+    parts = [
+        person.get('current_position_title') or '',
+        person.get('current_company_name') or '',
+        person.get('headline') or '',
+    ]
+    for exp in person.get('work_experience') or []:
+        parts.append(exp.get('employee_title') or '')
+        parts.append(exp.get('employer_name') or '')
+    for edu in person.get('education_background') or []:
+        parts.append(edu.get('degree_name') or '')
+        parts.append(edu.get('field_of_study') or '')
+        parts.append(edu.get('institute_name') or '')
+    skills = person.get('skills') or []
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    parts.extend(str(skill) for skill in skills)
+    return " ".join(parts)
+
+def years_of_experience(person, today=None):
+    """
+    Years since the earliest work_experience start date, or None if unknown
+    """
+    starts = []
+    for exp in person.get('work_experience') or []:
+        match = re.match(r"(\d{4})(?:-(\d{2}))?", str(exp.get('start_date') or ''))
+        if match:
+            starts.append(int(match.group(1)) + (int(match.group(2) or 1) - 1) / 12)
+    if not starts:
+        return None
+    today = today or date.today()
+    return max(0.0, today.year + (today.month - 1) / 12 - min(starts))
+
+def required_years(job_description):
+    """Largest 'N+ years' requirement mentioned in a job description, or None"""
+    years = [int(y) for y in YEARS_PATTERN.findall(job_description)]
+    return max(years) if years else None
+
+def bm25_scores(query_tokens, documents, k1=1.5, b=0.75):
+    """
+    BM25 score of every tokenized document against the query, as a NumPy array
+    """
+    terms = sorted(set(query_tokens))
+    if not terms or not documents:
+        return np.zeros(len(documents))
+    index = {term: i for i, term in enumerate(terms)}
+
+    # Term-frequency matrix restricted to query terms: documents x terms
+    tf = np.zeros((len(documents), len(terms)))
+    for row, tokens in enumerate(documents):
+        for token in tokens:
+            col = index.get(token)
+            if col is not None:
+                tf[row, col] += 1
+    doc_len = np.array([len(tokens) for tokens in documents], dtype=float)
+    avg_len = doc_len.mean() or 1.0
+
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * doc_len / avg_len)
+    weights = tf * (k1 + 1) / (tf + norm[:, None])
+    return weights @ idf
+
+def score_candidates(job_description, people):
+    """
+    Local relevance score for each person, in input order
+    """
+    query = tokenize(job_description)
+    scores = bm25_scores(query, [tokenize(candidate_text(p)) for p in people])
+
+    needed = required_years(job_description)
+    if needed:
+        years = np.array([
+            y if y is not None else needed
+            for y in (years_of_experience(p) for p in people)
+        ], dtype=float)
+        # Halve the score at zero experience, scaling up to full credit at the requirement
+        scores = scores * (0.5 + 0.5 * np.minimum(1.0, years / needed))
+    return scores
+
+def prefilter_candidates(job_description, people, top_k=20):
+    """
+    Keep the `top_k` best local matches for the LLM stage.
+    Returns (person, score) pairs sorted best-first.
+    """
+    if not people:
+        return []
+    scores = score_candidates(job_description, people)
+    order = np.argsort(-scores, kind="stable")
+    if top_k:
+        order = order[:top_k]
+    return [(people[i], float(scores[i])) for i in order]
@@ -0,0 +1,62 @@
+"""
+Condense CrustData person records before they go into a prompt.
+
+Raw enrich responses are full of nulls, empty lists, image links, URNs and
+internal IDs, and dumping them with indent=2 roughly doubles their size in
+whitespace alone. This strips the noise, trims long lists and text, and
+serializes the rest as compact JSON, keeping everything analyses actually
+read (titles, employers, dates, education, skills, summary).
+"""
+
+import json
+
+# Fields that never help an analysis
+NOISE_KEY_PARTS = {"picture", "logo", "image", "images", "urn", "url", "urls", "id", "ids"}
+URL_PREFIXES = ("http://", "https://")
+
+DEFAULT_MAX_LIST_ITEMS = 8
+DEFAULT_MAX_TEXT_CHARS = 600
+
+def estimate_tokens(text):
+    """
+    Rough token count for English/JSON text (about four characters per token)
+    """
+    return (len(text) + 3) // 4
+
+def _is_noise_key(key):
+    return any(part in NOISE_KEY_PARTS for part in key.lower().split("_"))
+
+def _is_empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+def _condense(value, max_list_items, max_text_chars):
+    if isinstance(value, dict):
+        condensed = {}
+        for key, item in value.items():
+            if _is_noise_key(key):
+                continue
+            item = _condense(item, max_list_items, max_text_chars)
+            if not _is_empty(item):
+                condensed[key] = item
+        return condensed
+    if isinstance(value, list):
+        items = [_condense(item, max_list_items, max_text_chars) for item in value[:max_list_items]]
+        return [item for item in items if not _is_empty(item)]
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith(URL_PREFIXES):
+            return None
+        if len(value) > max_text_chars:
+            return value[:max_text_chars].rstrip() + "…"
+    return value
+
+def condense_profile(person, max_list_items=DEFAULT_MAX_LIST_ITEMS, max_text_chars=DEFAULT_MAX_TEXT_CHARS):
+    """
+    Return a copy of a person record without empty/irrelevant fields and with
+    long lists and text trimmed
+    """
+    return _condense(person, max_list_items, max_text_chars)
+
+def compact_json(data):
+    """Serialize without indentation or padding"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,53 @@
+"""
+Memoized, mtime-aware loading of profile JSON files.
+
+Streamlit reruns the whole script on every widget interaction, and the
+analysis entry points reload person_data.json on every call. This keeps the
+parsed document in memory keyed on the file's path, mtime and size, so
+repeat loads cost one stat() and a new fetch is picked up automatically.
+
+Cached documents are shared between callers: treat them as read-only.
+"""
+
+import os
+import json
+import threading
+
+_cache = {}
+_lock = threading.Lock()
+
+def file_signature(path):
+    """(mtime_ns, size) of a file; changes whenever the file is rewritten"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def load_json_cached(path):
+    """
+    Parsed JSON for `path`, re-read only when its mtime or size changes.
+    Raises FileNotFoundError / json.JSONDecodeError like json.load would.
+    """
+    path = os.path.abspath(path)
+    signature = file_signature(path)
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with _lock:
+        _cache[path] = (signature, data)
+    return data
+
+def load_person(path="person_data.json"):
+    """
+    First person record in a profile file (CrustData returns a list), or None
+    """
+    data = load_json_cached(path)
+    if not data:
+        return None
+    return data[0] if isinstance(data, list) else data
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
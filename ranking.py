@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Bulk job-fit ranking: score a pool of candidates against one job description.
+
+An optional local BM25 pre-filter (see prefilter.py) first narrows the pool
+to the top-K structured matches. LLM calls then fan out over a bounded thread
+pool, each response's FIT SCORE is parsed out of the text (or, with
+--structured, read from a validated JSON result), and the pool comes back
+sorted best-first. Failed calls are retried with backoff and, if they
+still fail, are kept in the results with their error instead of stalling the
+batch.
+
+Usage:
+    python ranking.py --job job.txt profiles/
+    python ranking.py --job job.txt alice.json bob.json --workers 8 --output ranking.json
+    python ranking.py --job job.txt profiles/ --top-k 25
+    python ranking.py --job job.txt              # everyone in the candidate store
+    python ranking.py --job job.txt --retrieve 50  # the 50 stored candidates most like the job
+    python ranking.py --job job.txt --structured   # JSON results, stored for cheap queries
+    python ranking.py --job job.txt --stored       # stored structured results only, no LLM calls
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from llama_client import LlamaProcessor
+from prefilter import prefilter_candidates
+from similarity_index import retrieve_candidates
+from candidate_store import get_candidate_store
+from http_transport import CircuitOpenError, get_transport, format_metrics
+from job_fit_schema import format_job_fit
+
+FIT_SCORE_PATTERN = re.compile(r"fit\s*score", re.IGNORECASE)
+SCORE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(?:/\s*10)?")
+
+def parse_fit_score(analysis):
+    """
+    Pull the numeric FIT SCORE (1-10) out of a job fit analysis, or None if absent
+
+    >>> parse_fit_score("1. **FIT SCORE**: 8/10")
+    8.0
+    >>> parse_fit_score("**FIT SCORE (1–10): 7/10**")
+    7.0
+    >>> parse_fit_score("FIT SCORE (1 to 10): 4")
+    4.0
+    >>> parse_fit_score("**FIT SCORE**:\\n\\n6/10")
+    6.0
+    >>> print(parse_fit_score("1. **FIT SCORE** (1-10): Cannot determine from the data.\\n\\n2. **STRENGTHS**"))
+    None
+    >>> parse_fit_score("FIT SCORE: with 15 years in the field, 8/10")
+    8.0
+    """
+    if not analysis:
+        return None
+    match = FIT_SCORE_PATTERN.search(analysis)
+    if not match:
+        return None
+    # Only the rest of the heading's line (or the next line, if the heading
+    # stands alone), ignoring the "(1-10)" scale hint
+    lines = analysis[match.end():].split("\n")
+    tail = re.sub(r"\(?\s*1\s*(?:[-–—]|to)\s*10\s*\)?", " ", lines[0], count=1)
+    if not re.search(r"\w", tail):
+        tail = next((line for line in lines[1:] if line.strip()), "")
+    for score in SCORE_PATTERN.finditer(tail):
+        value = float(score.group(1))
+        if 1 <= value <= 10:
+            return value
+    return None
+
+def load_people(paths):
+    """
+    Load person records from JSON files or directories of JSON files.
+    CrustData responses are lists, so every record in each file is included.
+    """
+    people = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json"))
+        else:
+            files = [path]
+        for filename in files:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            people.extend(data if isinstance(data, list) else [data])
+    return people
+
+def _candidate_summary(person):
+    return {
+        "name": person.get('name', 'Unknown'),
+        "title": person.get('current_position_title', 'Unknown'),
+        "company": person.get('current_company_name', 'Unknown'),
+        "linkedin_url": person.get('linkedin_profile_url'),
+    }
+
+def _analyze_candidate(processor, person, job_description, structured):
+    """
+    One job fit analysis, saved to the candidate store so a later profile
+    refresh knows it may need re-running. Returns (fit_score, analysis text,
+    structured result or None).
+    """
+    store = get_candidate_store()
+    if structured:
+        fit = processor.analyze_candidate_structured(person, job_description)
+        store.save_job_fit(store.key_for(person), job_description, fit)
+        return fit["fit_score"], format_job_fit(fit), fit
+    analysis = processor.analyze_candidate(person, job_description)
+    store.save_analysis(store.key_for(person), "job_fit", analysis, job_description)
+    return parse_fit_score(analysis), analysis, None
+
+def _score_candidate(processor, person, job_description, retries, backoff, prefilter_score=None,
+                     structured=False):
+    """
+    Analyze one candidate, retrying failures with exponential backoff.
+    HTTP-level retries already happen in the transport; this covers the rest,
+    and gives up at once while the Llama circuit is open.
+    """
+    result = _candidate_summary(person)
+    result["prefilter_score"] = prefilter_score
+    for attempt in range(1, retries + 2):
+        start = time.perf_counter()
+        try:
+            fit_score, analysis, fit = _analyze_candidate(processor, person, job_description, structured)
+            result.update({
+                "fit_score": fit_score,
+                "analysis": analysis,
+                "structured": fit,
+                "error": None,
+                "attempts": attempt,
+                "elapsed": time.perf_counter() - start,
+            })
+            return result
+        except Exception as e:
+            error = str(e)
+            if isinstance(e, CircuitOpenError):
+                break
+            if attempt <= retries:
+                time.sleep(backoff * 2 ** (attempt - 1))
+    result.update({"fit_score": None, "analysis": None, "structured": None, "error": error,
+                   "attempts": attempt, "elapsed": None})
+    return result
+
+def rank_candidates(job_description, people, processor=None, max_workers=4, retries=2,
+                    timeout=60, backoff=1.0, on_result=None, top_k=None, structured=False):
+    """
+    Score every candidate in `people` against `job_description` and return the
+    results sorted by fit score, highest first. Candidates whose analysis failed
+    or had no parseable score sort last. `on_result` is called with each result
+    as soon as it finishes, so callers can show partial progress.
+
+    With `top_k`, only the best K local pre-filter matches are sent to the LLM.
+    With `structured`, each analysis is a validated JSON result (kept under
+    "structured") and is also stored in the candidate store's job_fits table.
+    """
+    if top_k:
+        shortlist = prefilter_candidates(job_description, people, top_k=top_k)
+    else:
+        shortlist = [(person, None) for person in people]
+
+    processor = processor or LlamaProcessor(timeout=timeout)
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_score_candidate, processor, person, job_description, retries, backoff, score,
+                            structured)
+            for person, score in shortlist
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+    return sorted(results, key=lambda r: (r["fit_score"] is None, -(r["fit_score"] or 0)))
+
+def print_ranking(results):
+    """Print a ranked table of candidates"""
+    print(f"\n{'#':>3}  {'Score':>5}  {'Name':<28} {'Role'}")
+    print("-" * 80)
+    for rank, r in enumerate(results, 1):
+        score = f"{r['fit_score']:.1f}" if r["fit_score"] is not None else "  -"
+        role = f"{r['title']} at {r['company']}"
+        line = f"{rank:>3}  {score:>5}  {r['name'][:28]:<28} {role}"
+        if r["error"]:
+            line += f"  ❌ {r['error']}"
+        print(line)
+
+def print_stored_ranking(job_description, limit=None, min_score=None):
+    """Print the stored structured results for a job, without any LLM calls"""
+    store = get_candidate_store()
+    summary = store.job_fit_summary(job_description)
+    if not summary["count"]:
+        print("❌ No stored structured results for this job. Run with --structured first.")
+        return 1
+    print(f"\n{'#':>3}  {'Score':>5}  {'Decision':<10} {'Name':<28} {'Role'}")
+    print("-" * 80)
+    for rank, r in enumerate(store.top_job_fits(job_description, limit=limit, min_score=min_score), 1):
+        role = f"{r['current_title'] or 'Unknown'} at {r['current_company'] or 'Unknown'}"
+        print(f"{rank:>3}  {r['fit_score']:>5}  {r['decision']:<10} {(r['name'] or r['key'])[:28]:<28} {role}")
+    decisions = ", ".join(f"{count} {decision}" for decision, count in sorted(summary["decisions"].items()))
+    print(f"\n📊 {summary['count']} analyses, average score {summary['average_score']:.1f} ({decisions})")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank candidates against a job description")
+    parser.add_argument("profiles", nargs="*", help="Profile JSON files or directories (default: the candidate store)")
+    parser.add_argument("--job", required=True, help="File containing the job description")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent Llama calls (default: 4)")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per candidate (default: 2)")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-call timeout in seconds (default: 60)")
+    parser.add_argument("--top-k", type=int, help="Only send the K best local keyword matches to the LLM")
+    parser.add_argument("--retrieve", type=int, metavar="K",
+                        help="Rank only the K stored candidates most similar to the job (similarity index)")
+    parser.add_argument("--structured", action="store_true",
+                        help="Request validated JSON results and store them for --stored queries")
+    parser.add_argument("--stored", action="store_true",
+                        help="List stored structured results for the job instead of calling the LLM")
+    parser.add_argument("--min-score", type=int, help="With --stored, only show scores at or above this")
+    parser.add_argument("--limit", type=int, help="With --stored, show at most this many candidates")
+    parser.add_argument("--output", help="Write the full ranking, including analyses, to this JSON file")
+    args = parser.parse_args(argv)
+
+    with open(args.job, 'r', encoding='utf-8') as f:
+        job_description = f.read()
+    if args.stored:
+        return print_stored_ranking(job_description, limit=args.limit, min_score=args.min_score)
+    if args.profiles:
+        people = load_people(args.profiles)
+    elif args.retrieve:
+        people = [person for person, _ in retrieve_candidates(job_description, args.retrieve)]
+        print(f"🧭 Retrieved the {len(people)} candidates most similar to the job")
+    else:
+        people = list(get_candidate_store().iter_people())
+    if not people:
+        print("❌ No candidates found.")
+        return 1
+
+    total = min(len(people), args.top_k) if args.top_k else len(people)
+    if total < len(people):
+        print(f"🔎 Pre-filtering {len(people)} candidates down to the top {total}")
+    print(f"🤖 Ranking {total} candidates ({args.workers} workers)...")
+    done = []
+
+    def report(result):
+        done.append(result)
+        status = f"score {result['fit_score']}" if not result["error"] else f"failed: {result['error']}"
+        print(f"  [{len(done)}/{total}] {result['name']}: {status}")
+
+    start = time.perf_counter()
+    results = rank_candidates(job_description, people, max_workers=args.workers,
+                              retries=args.retries, timeout=args.timeout, on_result=report,
+                              top_k=args.top_k, structured=args.structured)
+    print_ranking(results)
+    print(f"\n⏱️ Ranked {len(results)} candidates in {time.perf_counter() - start:.1f}s")
+    print(format_metrics(get_transport().metrics()))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Ranking saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
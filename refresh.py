@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Incremental re-enrichment of stale candidates.
+
+Picks stored candidates whose last fetch is older than a staleness threshold,
+re-fetches them in bulk and compares each new record with the stored one
+field by field. Unchanged candidates only get their fetch time bumped.
+Changed ones are saved, and their stored LLM analyses are re-run only when a
+field the analyses depend on changed (title, company, work history,
+education); a new connection count or profile photo costs nothing extra.
+Relevance is judged on the condensed records the prompts are built from, so
+signed logo URLs and employer IDs that change on every scrape don't count.
+
+Usage:
+    python refresh.py --max-age-days 30
+    python refresh.py --max-age-days 7 --limit 200 --workers 8 --rps 5 --no-reanalyze
+"""
+
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from crustdata import request_person_data, save_person_data, RateLimiter
+from candidate_store import get_candidate_store
+from profile_condenser import condense_profile
+
+# Changes to these fields invalidate stored analyses
+RELEVANT_FIELDS = ("current_position_title", "current_company_name", "work_experience", "education_background")
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+def diff_profiles(old, new):
+    """
+    Field-level diff of two person records. Returns {field: change} where a
+    change is {"old", "new"} for scalar fields and {"added", "removed"} items
+    for list fields. Unchanged fields are left out.
+    """
+    old, new = old or {}, new or {}
+    changes = {}
+    for field in sorted(set(old) | set(new)):
+        before, after = old.get(field), new.get(field)
+        if _canonical(before) == _canonical(after):
+            continue
+        if isinstance(before, list) and isinstance(after, list):
+            before_items = {_canonical(item): item for item in before}
+            after_items = {_canonical(item): item for item in after}
+            changes[field] = {
+                "added": [item for key, item in after_items.items() if key not in before_items],
+                "removed": [item for key, item in before_items.items() if key not in after_items],
+            }
+        else:
+            changes[field] = {"old": before, "new": after}
+    return changes
+
+def relevant_changes(old, new):
+    """
+    Fields that changed in a way that should trigger re-analysis, compared on
+    the condensed records (no URLs, logos or IDs) that analyses actually read
+    """
+    old, new = condense_profile(old or {}), condense_profile(new or {})
+    return [field for field in RELEVANT_FIELDS if _canonical(old.get(field)) != _canonical(new.get(field))]
+
+def reanalyze(person, key, store, processor):
+    """Re-run every stored analysis for a candidate; returns the kinds re-run"""
+    rerun = []
+    for stored in store.analyses(key):
+        if stored["kind"] == "job_fit" and stored["job_description"]:
+            analysis = processor.analyze_candidate(person, stored["job_description"])
+        elif stored["kind"] == "job_fit_structured" and stored["job_description"]:
+            fit = processor.analyze_candidate_structured(person, stored["job_description"])
+            store.save_job_fit(key, stored["job_description"], fit)
+            rerun.append(stored["kind"])
+            continue
+        elif stored["kind"] == "general":
+            analysis = processor.analyze_person(person)
+        else:
+            continue
+        store.save_analysis(key, stored["kind"], analysis, stored["job_description"])
+        rerun.append(stored["kind"])
+    return rerun
+
+def refresh_stale_profiles(max_age_seconds, limit=None, max_workers=8, requests_per_second=5,
+                           reanalyze_changed=True, processor=None, real_time=True, on_result=None):
+    """
+    Re-fetch stale candidates and update the store incrementally.
+    Returns one result dict per candidate: url, status (unchanged / changed /
+    failed), changed_fields, reanalyzed and error.
+    """
+    store = get_candidate_store()
+    stale = store.stale(max_age_seconds, limit)
+    limiter = RateLimiter(requests_per_second)
+    if reanalyze_changed and processor is None:
+        from llama_client import LlamaProcessor
+        processor = LlamaProcessor()
+
+    def refresh_one(row):
+        limiter.wait()
+        data = request_person_data(row["linkedin_url"], force_refresh=True, real_time=real_time)
+        if not data:
+            raise RuntimeError("CrustData returned no profile data")
+        person = data[0] if isinstance(data, list) else data
+        stored = store.get(row["key"])
+        changes = diff_profiles(stored, person)
+        result = {"url": row["linkedin_url"], "status": "unchanged", "changed_fields": sorted(changes),
+                  "reanalyzed": [], "error": None}
+        if not changes:
+            store.touch(row["key"])
+            return result
+        save_person_data(data, row["linkedin_url"], filename=None)
+        result["status"] = "changed"
+        if reanalyze_changed and relevant_changes(stored, person):
+            result["reanalyzed"] = reanalyze(person, row["key"], store, processor)
+        return result
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(refresh_one, row): row for row in stale}
+        for future in as_completed(futures):
+            row = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"url": row["linkedin_url"], "status": "failed", "changed_fields": [],
+                          "reanalyzed": [], "error": str(e)}
+            results.append(result)
+            if on_result:
+                on_result(result, len(results), len(stale))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-fetch stale candidates and re-run affected analyses")
+    parser.add_argument("--max-age-days", type=float, default=30, help="Refresh profiles fetched longer ago than this (default: 30)")
+    parser.add_argument("--limit", type=int, help="Refresh at most this many profiles, oldest first")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent fetches (default: 8)")
+    parser.add_argument("--rps", type=float, default=5, help="Max CrustData requests per second, 0 for no limit (default: 5)")
+    parser.add_argument("--no-reanalyze", action="store_true", help="Only update profiles; don't re-run analyses")
+    parser.add_argument("--no-realtime", action="store_true", help="Use CrustData's stored records instead of a live scrape")
+    args = parser.parse_args(argv)
+
+    def report(result, done, total):
+        if result["status"] == "failed":
+            print(f"❌ [{done}/{total}] {result['url']}: {result['error']}")
+        elif result["status"] == "changed":
+            rerun = f" → re-ran {', '.join(result['reanalyzed'])}" if result["reanalyzed"] else ""
+            print(f"🔄 [{done}/{total}] {result['url']}: {', '.join(result['changed_fields'])}{rerun}")
+        else:
+            print(f"✅ [{done}/{total}] {result['url']}: unchanged")
+
+    start = time.perf_counter()
+    results = refresh_stale_profiles(
+        args.max_age_days * 86400, limit=args.limit, max_workers=args.workers,
+        requests_per_second=args.rps, reanalyze_changed=not args.no_reanalyze,
+        real_time=not args.no_realtime, on_result=report,
+    )
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("unchanged", "changed", "failed")}
+    reanalyzed = sum(1 for r in results if r["reanalyzed"])
+    print(f"\n📊 {len(results)} stale profiles: {counts['changed']} changed ({reanalyzed} re-analyzed), "
+          f"{counts['unchanged']} unchanged, {counts['failed']} failed in {time.perf_counter() - start:.1f}s")
+    return 1 if counts["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Local similarity index over enriched profiles.
+
+Each candidate's matching text (title, company, work experience, education,
+skills) is embedded locally and kept as one row of a memory-mapped NumPy
+matrix, so "people like this one" or "people like this job" is a cosine
+top-K over the matrix with no LLM call. Profiles are added incrementally as
+they are fetched; re-fetching a candidate overwrites their row in place.
+
+Embeddings come from feature hashing of word unigrams and bigrams
+(HashingEmbedder), which needs nothing beyond NumPy. Set EMBEDDING_MODEL to
+a sentence-transformers model name to use that instead, if the package is
+installed. Changing the embedder requires a rebuild.
+
+Files (SIMILARITY_INDEX_PATH, default similarity_index/):
+    vectors.npy     float32 matrix, one L2-normalized row per candidate
+    keys.json       row → candidate key, plus the embedder name and dimension
+    index.lock      held while writing
+
+Several processes (the app, a batch fetch, a refresh) can share one index:
+writers hold an exclusive lock on index.lock and reload the files first when
+another process has changed them, and searches reload the same way.
+
+Usage:
+    python similarity_index.py --rebuild
+    python similarity_index.py --like https://www.linkedin.com/in/username/ -k 10
+    python similarity_index.py --job job.txt -k 25
+"""
+
+import os
+import sys
+import json
+import zlib
+import argparse
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+from prefilter import tokenize, candidate_text
+from candidate_store import get_candidate_store, candidate_key
+
+DEFAULT_INDEX_PATH = "similarity_index"
+DEFAULT_DIM = 1024
+SEARCH_BLOCK_ROWS = 8192
+
+class EmbedderMismatchError(RuntimeError):
+    """The index on disk was built with another embedder; it needs --rebuild"""
+
+def profile_text(person):
+    """Text embedded for a candidate: the matching fields plus role descriptions"""
+    parts = [candidate_text(person)]
+    for exp in person.get('work_experience') or []:
+        parts.append(exp.get('description') or '')
+    return " ".join(parts)
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of unigrams and bigrams with sublinear term
+    frequency, L2-normalized. Deterministic across processes.
+    """
+    def __init__(self, dim=DEFAULT_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            counts = {}
+            for feature in features:
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                matrix[row, h % self.dim] += sign * (1.0 + np.log(count))
+        return _normalize(matrix)
+
+class SentenceTransformerEmbedder:
+    """Embeddings from a local sentence-transformers model"""
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts):
+        return _normalize(np.asarray(self.model.encode(list(texts), batch_size=64), dtype=np.float32))
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def default_embedder():
+    model_name = os.getenv("EMBEDDING_MODEL")
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except ImportError:
+            print("⚠️ sentence-transformers not installed; using hashed embeddings", file=sys.stderr)
+    return HashingEmbedder()
+
+class SimilarityIndex:
+    """
+    Memory-mapped matrix of candidate embeddings with cosine top-K search
+    """
+    def __init__(self, path=DEFAULT_INDEX_PATH, embedder=None):
+        self.path = path
+        self.embedder = embedder or default_embedder()
+        self.keys = []
+        self._rows = {}
+        self._vectors = None
+        self._stamp = None
+        self._built_with = None
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.path, "vectors.npy")
+
+    @property
+    def keys_path(self):
+        return os.path.join(self.path, "keys.json")
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.path, "index.lock")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, person, key=None):
+        """Insert or update one candidate"""
+        self.add_many([(person, key)])
+
+    def add_many(self, people):
+        """
+        Insert or update many candidates in one batch. `people` is an iterable
+        of person dicts or (person, key) pairs; keys default to candidate_key().
+        """
+        items = [item if isinstance(item, tuple) else (item, None) for item in people]
+        if not items:
+            return
+        keys = [key or candidate_key(person) for person, key in items]
+        vectors = self.embedder.embed([profile_text(person) for person, _ in items])
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._built_with is not None:
+                # Writing would start a new index over the existing one
+                raise EmbedderMismatchError(
+                    f"Similarity index at {self.path} was built with {self._built_with}, not "
+                    f"{self.embedder.name}; run python similarity_index.py --rebuild"
+                )
+            for key, vector in zip(keys, vectors):
+                row = self._rows.get(key)
+                if row is None:
+                    row = len(self.keys)
+                    self._ensure_capacity(row + 1)
+                    self.keys.append(key)
+                    self._rows[key] = row
+                self._vectors[row] = vector
+            self._vectors.flush()
+            self._save_keys()
+
+    def search(self, queries, k=10, exclude=None):
+        """
+        Cosine top-K for each query vector (rows of `queries`). Returns one list
+        of (key, score) pairs per query, best first. The matrix is scanned in
+        blocks so memory stays flat however large the index gets.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            self._refresh()
+            count = len(self.keys)
+            keys = list(self.keys)
+            vectors = self._vectors
+        if not count:
+            return [[] for _ in queries]
+
+        scores = np.empty((len(queries), count), dtype=np.float32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            block = vectors[start:min(count, start + SEARCH_BLOCK_ROWS)]
+            scores[:, start:start + len(block)] = queries @ block.T
+        excluded = {self._rows[key] for key in (exclude or ()) if key in self._rows}
+        if excluded:
+            scores[:, list(excluded)] = -np.inf
+
+        k = min(k, count - len(excluded))
+        if k <= 0:
+            return [[] for _ in queries]
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            results.append([(keys[i], float(row[i])) for i in top])
+        return results
+
+    def similar_to_person(self, person, k=10, key=None):
+        """
+        Candidates most like `person`, excluding the person themself. Pass the
+        key they are indexed under (their store key) when it is known.
+        """
+        query = self.embedder.embed([profile_text(person)])
+        return self.search(query, k, exclude=[key or candidate_key(person)])[0]
+
+    def similar_to_text(self, text, k=10):
+        """Candidates most like a free-text query such as a job description"""
+        return self.search(self.embedder.embed([text]), k)[0]
+
+    def rebuild(self, people, batch_size=500):
+        """Drop the index and re-embed every person in `people`"""
+        with self._lock, self._file_lock():
+            self.keys, self._rows = [], {}
+            self._vectors = None
+            self._built_with = None
+            for path in (self.vectors_path, self.keys_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._stamp = self._file_stamp()
+        batch = []
+        for person in people:
+            batch.append(person)
+            if len(batch) >= batch_size:
+                self.add_many(batch)
+                batch = []
+        self.add_many(batch)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on index.lock, shared by every process using this path"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.lock_path, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _file_stamp(self):
+        """Identity of the files on disk; it changes whenever any process writes them"""
+        try:
+            keys, vectors = os.stat(self.keys_path), os.stat(self.vectors_path)
+        except FileNotFoundError:
+            return None
+        return keys.st_ino, keys.st_mtime_ns, keys.st_size, vectors.st_ino
+
+    def _refresh(self):
+        """Reload if another process has written the index since we last read it"""
+        if self._file_stamp() != self._stamp:
+            self._load()
+
+    def _load(self):
+        self.keys, self._rows, self._vectors = [], {}, None
+        self._built_with = None
+        self._stamp = self._file_stamp()
+        if self._stamp is None:
+            return
+        with open(self.keys_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("embedder") != self.embedder.name:
+            print(f"⚠️ Similarity index was built with {meta.get('embedder')}; run --rebuild", file=sys.stderr)
+            self._built_with = meta.get("embedder")
+            return
+        self.keys = meta["keys"]
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+    def _ensure_capacity(self, rows):
+        """Grow the memory-mapped matrix (doubling) so it holds at least `rows`"""
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        new_capacity = max(rows, capacity * 2, 256)
+        tmp_path = self.vectors_path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                                          shape=(new_capacity, self.embedder.dim))
+        if capacity:
+            grown[:capacity] = self._vectors[:capacity]
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(tmp_path, self.vectors_path)
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+    def _save_keys(self):
+        tmp_path = self.keys_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"embedder": self.embedder.name, "dim": self.embedder.dim, "keys": self.keys}, f)
+        os.replace(tmp_path, self.keys_path)
+        self._stamp = self._file_stamp()
+
+def retrieve_candidates(job_description, k=25, index=None, store=None):
+    """
+    Retrieval stage for job fit analysis: the K stored candidates most similar
+    to a job description, as (person, score) pairs
+    """
+    index = index or get_similarity_index()
+    store = store or get_candidate_store()
+    people = []
+    for key, score in index.similar_to_text(job_description, k):
+        person = store.get(key)
+        if person is not None:
+            people.append((person, score))
+    return people
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+def get_similarity_index():
+    """Return the process-wide index at SIMILARITY_INDEX_PATH (default similarity_index/)"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = SimilarityIndex(os.getenv("SIMILARITY_INDEX_PATH", DEFAULT_INDEX_PATH))
+        return _default_index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find candidates similar to a person or a job description")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every candidate in the store")
+    parser.add_argument("--like", metavar="URL", help="LinkedIn URL (or store key) of a candidate to match")
+    parser.add_argument("--job", metavar="FILE", help="Job description to match")
+    parser.add_argument("-k", type=int, default=10, help="Number of matches (default: 10)")
+    args = parser.parse_args(argv)
+
+    index = get_similarity_index()
+    store = get_candidate_store()
+    if args.rebuild:
+        index.rebuild(store.iter_people())
+        print(f"🧭 Indexed {len(index)} candidates")
+    if args.like:
+        person = store.get(args.like)
+        if person is None:
+            print(f"❌ {args.like} is not in the candidate store")
+            return 1
+        matches = index.similar_to_person(person, args.k, key=store.key_for(person))
+    elif args.job:
+        with open(args.job, 'r', encoding='utf-8') as f:
+            matches = index.similar_to_text(f.read(), args.k)
+    else:
+        return 0
+
+    for rank, (key, score) in enumerate(matches, 1):
+        person = store.get(key) or {}
+        print(f"{rank:>3}. {score:.3f}  {person.get('name', key)} - "
+              f"{person.get('current_position_title', 'Unknown')} at {person.get('current_company_name', 'Unknown')}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
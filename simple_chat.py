@@ -4,22 +4,16 @@ Super simple chat interface for person_data.json
 Just load the data and ask questions about it!
 """
 
-import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from llama_client import LlamaProcessor, print_stream
+from token_budget import format_budget_stats
+from chat_session import ChatSession
 
 def main():
     """Simple chat with person_data.json"""
     
-    # Initialize the OpenAI client with Llama API
-    client = OpenAI(
-        api_key=os.environ.get("LLAMA_API_KEY"), 
-        base_url="https://api.llama.com/compat/v1/"
-    )
+    # Initialize the Llama client
+    processor = LlamaProcessor()
     
     # Load person data
     try:
@@ -39,6 +33,10 @@ def main():
     else:
         person = person_data
     
+    # The profile goes into the system message once; follow-ups reuse the history
+    session = ChatSession(person, processor)
+    print(format_budget_stats(session.profile_stats))
+    
     print("\n🤖 Ask me anything about the person data!")
     print("Type 'quit' to exit.\n")
     
@@ -52,30 +50,9 @@ def main():
         if not user_question:
             continue
         
-        # Create a simple prompt
-        prompt = f"""
-        Based on the following person data, please answer the user's question:
-
-        Person Data:
-        {json.dumps(person, indent=2)}
-
-        User Question: {user_question}
-
-        Please provide a helpful and accurate answer based on the data above.
-        """
-        
         try:
-            completion = client.chat.completions.create(
-                model="Llama-4-Maverick-17B-128E-Instruct-FP8",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-            )
-            response = completion.choices[0].message.content
-            print(f"\n🤖 Assistant: {response}\n")
+            print("\n🤖 Assistant: ", end="", flush=True)
+            print_stream(session.stream(user_question), processor)
         except Exception as e:
             print(f"❌ Error: {str(e)}\n")
 
@@ -0,0 +1,179 @@
+"""
+Request coalescing ("single flight").
+
+When several callers in one process ask for the same thing at the same time
+(the same profile URL, the same prompt), only the first one, the leader,
+makes the upstream call. The rest wait for it and get the same result, or
+the same exception. Nothing is kept once the call finishes; repeat requests
+after that are the caches' job.
+
+Streams are shared too: followers of a streamed call replay the tokens the
+leader has received so far and then follow it live. If the leader stops
+reading before the stream ends (a closed tab, a Streamlit rerun), followers
+that have not received anything yet start a call of their own; the others
+get StreamAbandonedError rather than a silently truncated answer.
+
+Every coalesced call counts toward the singleflight.coalesced metric
+(labelled by group), next to singleflight.leader for the calls that went out.
+"""
+
+import threading
+
+from metrics import get_metrics
+
+class StreamAbandonedError(RuntimeError):
+    """The leading caller stopped reading a shared stream before it ended"""
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _SharedStream:
+    def __init__(self):
+        self.tokens = []
+        self.finished = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def follow(self):
+        """Yield every token of the stream, waiting for new ones until it ends"""
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.tokens) and not self.finished:
+                    self.condition.wait()
+                pending = self.tokens[index:]
+                finished, error = self.finished, self.error
+            index += len(pending)
+            yield from pending
+            if finished and index >= len(self.tokens):
+                if error is not None:
+                    raise error
+                return
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with equal keys within one group
+    """
+    def __init__(self, group):
+        self.group = group
+        self._calls = {}
+        self._streams = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Return fn(), sharing one in-flight call among callers with the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            # Followers get the leader's error; an interrupt only stops the leader
+            call.error = e if isinstance(e, Exception) else RuntimeError("coalesced call was interrupted")
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stream(self, key, make_iter):
+        """
+        Yield the tokens of make_iter(), sharing one in-flight stream among
+        callers with the same key. A follower that stops reading early does
+        not affect the others. If the leader stops early, followers with no
+        tokens yet retry on their own and the rest raise StreamAbandonedError.
+        """
+        with self._lock:
+            shared = self._streams.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._streams[key] = _SharedStream()
+        self._count(leader)
+        if not leader:
+            received = 0
+            try:
+                for token in shared.follow():
+                    received += 1
+                    yield token
+            except StreamAbandonedError:
+                if received:
+                    raise
+                # Nothing shown yet, so nothing is lost by starting over
+                yield from self.stream(key, make_iter)
+            return
+
+        error, completed = None, False
+        try:
+            for token in make_iter():
+                with shared.condition:
+                    shared.tokens.append(token)
+                    shared.condition.notify_all()
+                yield token
+            completed = True
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            with shared.condition:
+                if not completed:
+                    # GeneratorExit or an interrupt: followers must not take a cut-off stream as the answer
+                    shared.error = error if isinstance(error, Exception) else StreamAbandonedError(
+                        "the shared stream was abandoned before it finished")
+                shared.finished = True
+                shared.condition.notify_all()
+
+    async def ado(self, key, fn):
+        """
+        Async version of do: `fn` returns an awaitable. Calls are only shared
+        within one event loop. A cancelled caller does not cancel the shared call.
+        """
+        import asyncio
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(loop_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[loop_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget_task(loop_key, task))
+        self._count(leader)
+        return await asyncio.shield(task)
+
+    def in_flight(self):
+        """Number of distinct calls currently running"""
+        with self._lock:
+            return len(self._calls) + len(self._streams) + len(self._tasks)
+
+    def _forget_task(self, loop_key, task):
+        with self._lock:
+            if self._tasks.get(loop_key) is task:
+                del self._tasks[loop_key]
+
+    def _count(self, leader):
+        get_metrics().incr("singleflight.leader" if leader else "singleflight.coalesced", group=self.group)
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+def get_single_flight(group):
+    """Return the process-wide SingleFlight for a group such as "crustdata" or "llm" """
+    with _groups_lock:
+        flight = _groups.get(group)
+        if flight is None:
+            flight = _groups[group] = SingleFlight(group)
+        return flight
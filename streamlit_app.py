@@ -7,21 +7,37 @@ Turn your friend group into a bounty hunting squad!
 import streamlit as st
 import json
 import os
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
-import subprocess
 import sys
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from enrichment_cache import get_enrichment_cache
+from candidate_store import get_candidate_store
+from profile_loader import load_json_cached, file_signature
+from token_budget import format_budget_stats
+from llm_cache import person_fingerprint
+from chat_session import ChatSession
+from metrics import get_metrics
+from http_transport import get_transport
+
 try:
-    from llama_client import LlamaProcessor
+    from llama_client import LlamaProcessor, format_timing
+    from client_registry import get_llama_client
+    from pipeline import StageTimer, fetch_profile
 except ImportError:
     st.error("⚠️ LlamaProcessor not available. Some features may be limited.")
 
+@st.cache_resource
+def get_shared_llama_client():
+    """One pooled Llama client shared by every page and session"""
+    return get_llama_client()
+
+def get_processor():
+    """Lightweight per-request processor on top of the shared client"""
+    return LlamaProcessor(client=get_shared_llama_client())
+
 # Configure page
 st.set_page_config(
     page_title="Referral Bounty Hunter",
@@ -106,7 +122,7 @@ def main():
         
         page = st.selectbox(
             "🎯 Choose Your Mission",
-            ["🏠 Bounty Dashboard", "🔍 Scout Talent", "💼 Job Fit Analysis", "💬 Intel Chat", "🏆 Leaderboard"]
+            ["🏠 Bounty Dashboard", "🔍 Scout Talent", "💼 Job Fit Analysis", "💬 Intel Chat", "🏆 Leaderboard", "🩺 Diagnostics"]
         )
         
         st.markdown("---")
@@ -128,9 +144,15 @@ def main():
         show_intel_chat()
     elif page == "🏆 Leaderboard":
         show_leaderboard()
+    elif page == "🩺 Diagnostics":
+        show_diagnostics()
 
 def show_dashboard():
     """Main dashboard with bounty overview"""
+    # Charting libraries are only loaded by the pages that chart
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
     st.markdown("## 🎯 Active Bounties")
     
     # Sample bounty data
@@ -192,6 +214,40 @@ def show_dashboard():
         fig.update_traces(marker=dict(colors=colors))
         fig.update_layout(title="Referral Success Rate")
         st.plotly_chart(fig, use_container_width=True)
+    
+    show_job_fit_scores()
+
+def show_job_fit_scores():
+    """Score distribution and top candidates from stored structured job fit results"""
+    import pandas as pd
+    import plotly.express as px
+    
+    store = get_candidate_store()
+    jobs = store.job_fit_jobs()
+    if not jobs:
+        return
+    
+    st.markdown("---")
+    st.markdown("### 📈 Job Fit Scores")
+    labels = {job["job_hash"]: f"{(job['job_description'] or '').strip()[:60]}… ({job['count']})" for job in jobs}
+    selected = st.selectbox("Job", list(labels), format_func=labels.get)
+    job_description = next(job["job_description"] for job in jobs if job["job_hash"] == selected)
+    summary = store.job_fit_summary(job_description)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        scores = list(range(1, 11))
+        fig = px.bar(x=scores, y=[summary["scores"].get(score, 0) for score in scores],
+                     labels={"x": "Fit score", "y": "Candidates"},
+                     title=f"{summary['count']} candidates, average {summary['average_score']:.1f}")
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        top = store.top_job_fits(job_description, limit=10)
+        st.dataframe(pd.DataFrame([
+            {"Score": r["fit_score"], "Decision": r["decision"].replace("_", " "), "Name": r["name"] or r["key"],
+             "Role": f"{r['current_title'] or 'Unknown'} at {r['current_company'] or 'Unknown'}"}
+            for r in top
+        ]), hide_index=True, use_container_width=True)
 
 def show_talent_scout():
     """Talent scouting page"""
@@ -204,6 +260,10 @@ def show_talent_scout():
         placeholder="https://www.linkedin.com/in/username",
         help="Enter a LinkedIn profile URL to scout this person"
     )
+    force_refresh = st.checkbox(
+        "🔄 Force refresh",
+        help="Skip the local cache and pull a fresh profile from CrustData"
+    )
     
     col1, col2 = st.columns(2)
     
@@ -211,7 +271,7 @@ def show_talent_scout():
         if st.button("🔍 Scout This Person", type="primary"):
             if linkedin_url:
                 with st.spinner("🕵️ Scouting talent... This may take a moment"):
-                    success = run_crustdata_fetch(linkedin_url)
+                    success = run_crustdata_fetch(linkedin_url, force_refresh=force_refresh)
                     if success:
                         st.markdown('<div class="success-message">✅ Talent scouted successfully!</div>', unsafe_allow_html=True)
                         st.rerun()
@@ -228,10 +288,19 @@ def show_talent_scout():
             else:
                 st.info("No sample data available. Scout someone first!")
     
+    cache_stats = get_enrichment_cache().stats()
+    st.caption(
+        f"💾 Enrichment cache: {cache_stats['entries']} profiles · "
+        f"{cache_stats['lifetime_hits']} hits / {cache_stats['lifetime_misses']} misses "
+        f"({cache_stats['hit_rate']:.0%} of lookups saved)"
+        + (f" · last fetch {st.session_state.last_fetch_seconds:.2f}s" if "last_fetch_seconds" in st.session_state else "")
+    )
+    
+    show_candidate_store()
+    
     # Display current scouted person if data exists
     if os.path.exists("person_data.json"):
-        with open("person_data.json", 'r') as f:
-            person_data = json.load(f)
+        person_data = load_json_cached("person_data.json")
         
         if person_data:
             person = person_data[0] if isinstance(person_data, list) else person_data
@@ -261,6 +330,45 @@ def show_talent_scout():
                         school = edu.get('institute_name', 'Unknown')
                         st.write(f"• {degree} from {school}")
 
+def show_candidate_store():
+    """Search previously scouted candidates and make one the current target"""
+    store = get_candidate_store()
+    with st.expander(f"🗂️ Candidate Store ({store.count()} scouted)"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            name = st.text_input("Name starts with", key="store_name")
+        with col2:
+            company = st.text_input("Company starts with", key="store_company")
+        with col3:
+            title = st.text_input("Title starts with", key="store_title")
+        
+        matches = store.find(name=name, company=company, title=title, limit=50)
+        if not matches:
+            st.info("No stored candidates match.")
+            return
+        
+        labels = {
+            m["key"]: f"{m['name'] or 'Unknown'} - {m['current_title'] or 'Unknown'} at {m['current_company'] or 'Unknown'}"
+            for m in matches
+        }
+        selected = st.selectbox("Candidates", list(labels), format_func=labels.get)
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🎯 Make Current Target"):
+                person = store.get(selected)
+                with open("person_data.json", 'w', encoding='utf-8') as f:
+                    json.dump([person], f, indent=2, ensure_ascii=False)
+                st.rerun()
+        with col2:
+            find_similar = st.button("🧭 Find Similar")
+        if find_similar:
+            # Imported here: the index needs NumPy, which most page loads don't
+            from similarity_index import get_similarity_index
+            for key, score in get_similarity_index().similar_to_person(store.get(selected), k=10, key=selected):
+                match = store.get(key) or {}
+                st.markdown(f"- **{match.get('name', key)}** - {match.get('current_position_title', 'Unknown')} "
+                            f"at {match.get('current_company_name', 'Unknown')} · similarity {score:.2f}")
+
 def show_job_fit():
     """Job fit analysis page"""
     st.markdown("## 💼 Job Fit Analysis")
@@ -279,15 +387,22 @@ def show_job_fit():
         help="Enter the complete job description for analysis"
     )
     
+    structured = st.checkbox("🧾 Structured result", help="Score, strengths, gaps and questions as validated JSON, saved for the dashboard")
+    
     if st.button("🎯 Analyze Job Fit", type="primary"):
         if job_description.strip():
-            with st.spinner("🤖 AI is analyzing the job fit..."):
-                processor = LlamaProcessor()
-                analysis = processor.analyze_job_fit(job_description)
-                
-                st.markdown("---")
-                st.markdown("## 🎯 Analysis Results")
-                st.markdown(analysis)
+            processor = get_processor()
+            
+            st.markdown("---")
+            st.markdown("## 🎯 Analysis Results")
+            try:
+                if structured:
+                    show_structured_job_fit(processor, job_description)
+                else:
+                    st.write_stream(processor.stream_job_fit(job_description))
+                    st.caption(format_timing(processor.last_timing))
+            except Exception as e:
+                st.error(f"Error processing with Llama API: {str(e)}")
         else:
             st.warning("Please enter a job description first!")
     
@@ -310,6 +425,31 @@ def show_job_fit():
     if 'job_template' in st.session_state:
         st.text_area("Template loaded:", value=st.session_state.job_template, height=100)
 
+def show_structured_job_fit(processor, job_description):
+    """Run a structured job fit analysis for the current target, save and display it"""
+    person_data = load_json_cached("person_data.json")
+    person = person_data[0] if isinstance(person_data, list) else person_data
+    with st.spinner("Analyzing..."):
+        fit = processor.analyze_candidate_structured(person, job_description)
+    store = get_candidate_store()
+    store.save_job_fit(store.key_for(person), job_description, fit)
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.metric("Fit Score", f"{fit['fit_score']}/10")
+    with col2:
+        recommendation = fit["recommendation"]
+        st.markdown(f"**Recommendation: {recommendation['decision'].replace('_', ' ')}** — {recommendation['reason']}")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### ✅ Strengths")
+        st.markdown("\n".join(f"- {item}" for item in fit["strengths"]) or "None noted")
+    with col2:
+        st.markdown("### ⚠️ Gaps")
+        st.markdown("\n".join(f"- {item}" for item in fit["gaps"]) or "None noted")
+    st.markdown("### 🎤 Interview Questions")
+    st.markdown("\n".join(f"- {item}" for item in fit["interview_questions"]) or "None suggested")
+
 def show_intel_chat():
     """Intelligence chat interface"""
     st.markdown("## 💬 Intel Chat")
@@ -320,15 +460,25 @@ def show_intel_chat():
         st.warning("🔍 No scouted talent found! Go to the Scout Talent page first.")
         return
     
-    # Load person data
-    with open("person_data.json", 'r') as f:
-        person_data = json.load(f)
+    # Load person data (parsed once per file version, not on every rerun)
+    person_data = load_json_cached("person_data.json")
     
     person = person_data[0] if isinstance(person_data, list) else person_data
     
+    # One conversation per scouted person; a new fetch starts a fresh chat
+    signature = file_signature("person_data.json")
+    session = st.session_state.get("chat_session")
+    if session is None or st.session_state.get("chat_signature") != signature:
+        if session is None or session.fingerprint != person_fingerprint(person):
+            session = ChatSession(person, get_processor())
+            st.session_state.chat_session = session
+            st.session_state.messages = []
+        st.session_state.chat_signature = signature
+    
     # Display current target
     st.markdown("### 🎯 Current Intel Target")
     st.info(f"**{person.get('name', 'Unknown')}** - {person.get('current_position_title', 'Unknown')} at {person.get('current_company_name', 'Unknown')}")
+    st.caption(format_budget_stats(session.profile_stats))
     
     # Chat interface
     if "messages" not in st.session_state:
@@ -348,33 +498,17 @@ def show_intel_chat():
         
         # Generate AI response
         with st.chat_message("assistant"):
-            with st.spinner("🤖 Analyzing intel..."):
-                processor = LlamaProcessor()
-                
-                # Create a simple prompt with the person data and user question
-                full_prompt = f"""
-                Based on the following person data, please answer the user's question:
-
-                Person Data:
-                {json.dumps(person, indent=2)}
-
-                User Question: {prompt}
-
-                Please provide a helpful and accurate answer based on the data above.
-                """
-                
-                try:
-                    completion = processor.client.chat.completions.create(
-                        model="Llama-4-Maverick-17B-128E-Instruct-FP8",
-                        messages=[{"role": "user", "content": full_prompt}],
-                    )
-                    response = completion.choices[0].message.content
-                    st.markdown(response)
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                except Exception as e:
-                    error_msg = f"Error getting intel: {str(e)}"
-                    st.error(error_msg)
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
+            try:
+                response = st.write_stream(session.stream(prompt))
+                st.caption(
+                    f"{format_timing(session.processor.last_timing)} · "
+                    f"~{session.last_payload_tokens:,} tokens sent"
+                )
+                st.session_state.messages.append({"role": "assistant", "content": response})
+            except Exception as e:
+                error_msg = f"Error getting intel: {str(e)}"
+                st.error(error_msg)
+                st.session_state.messages.append({"role": "assistant", "content": error_msg})
 
 def show_leaderboard():
     """Leaderboard page"""
@@ -427,17 +561,74 @@ def show_leaderboard():
     with col4:
         st.metric("Success Rate", "72%", "↗️ 5%")
 
-def run_crustdata_fetch(linkedin_url=None):
-    """Run the crustdata.py script to fetch person data"""
+def show_diagnostics():
+    """Latency percentiles, payload sizes, token usage and cache hits for this process"""
+    import pandas as pd
+    
+    st.markdown("## 🩺 Diagnostics")
+    st.markdown("Where the time goes in this app process: CrustData fetches, prompt building, LLM requests and generation.")
+    
+    if st.button("🔄 Reset metrics"):
+        get_metrics().reset()
+    
+    snapshot = get_metrics().snapshot()
+    if not snapshot["observations"] and not snapshot["counters"]:
+        st.info("No metrics yet. Scout a candidate or run an analysis first.")
+        return
+    
+    rows = []
+    for s in snapshot["observations"]:
+        # Spans are recorded in seconds; show them in milliseconds
+        scale = 1000 if s["name"].endswith(".seconds") else 1
+        rows.append({
+            "metric": s["name"].replace(".seconds", " (ms)"),
+            "labels": ", ".join(f"{k}={v}" for k, v in s["labels"].items()),
+            "count": s["count"],
+            "p50": round(s["p50"] * scale, 1),
+            "p95": round(s["p95"] * scale, 1),
+            "p99": round(s["p99"] * scale, 1),
+        })
+    st.markdown("### ⏱️ Latency and sizes")
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    
+    counters = {(c["name"], c["labels"].get("cache")): c["value"] for c in snapshot["counters"]}
+    caches = sorted({cache for name, cache in counters if cache})
+    if caches:
+        st.markdown("### 🎯 Cache hits")
+        cols = st.columns(len(caches))
+        for col, cache in zip(cols, caches):
+            hits = counters.get(("cache.hit", cache), 0)
+            misses = counters.get(("cache.miss", cache), 0)
+            with col:
+                st.metric(f"{cache} cache", f"{hits / (hits + misses):.0%}" if hits + misses else "-",
+                          f"{hits} hits / {misses} misses", delta_color="off")
+    
+    flights = {}
+    for c in snapshot["counters"]:
+        if c["name"] in ("singleflight.leader", "singleflight.coalesced"):
+            flights.setdefault(c["labels"].get("group"), {})[c["name"].split(".")[1]] = c["value"]
+    if flights:
+        st.markdown("### 🔗 Coalesced requests")
+        cols = st.columns(len(flights))
+        for col, (group, counts) in zip(cols, sorted(flights.items())):
+            with col:
+                st.metric(f"{group} calls shared", counts.get("coalesced", 0),
+                          f"{counts.get('leader', 0)} upstream calls", delta_color="off")
+    
+    endpoints = get_transport().metrics()
+    if endpoints:
+        st.markdown("### 📡 Upstream endpoints")
+        st.dataframe(pd.DataFrame([{"endpoint": name, **m} for name, m in endpoints.items()]),
+                     use_container_width=True, hide_index=True)
+
+def run_crustdata_fetch(linkedin_url=None, force_refresh=False):
+    """Fetch person data in-process and save it to person_data.json"""
     try:
-        if linkedin_url:
-            result = subprocess.run([sys.executable, "crustdata.py", linkedin_url], 
-                                  capture_output=True, text=True, cwd=os.getcwd())
-        else:
-            result = subprocess.run([sys.executable, "crustdata.py"], 
-                                  capture_output=True, text=True, cwd=os.getcwd())
-        
-        return result.returncode == 0
+        timer = StageTimer()
+        with timer.stage("fetch"):
+            fetch_profile(linkedin_url, force_refresh=force_refresh)
+        st.session_state.last_fetch_seconds = timer.timings["fetch"]
+        return True
     except Exception as e:
         st.error(f"Error running talent scout: {str(e)}")
         return False
@@ -0,0 +1,217 @@
+"""
+Token budgeting for prompts that embed a person record.
+
+The condenser strips noise but leaves the size of a profile unbounded: a
+long career, many schools or a feed of posts still produce a prompt that is
+slow, expensive or over the context limit. fit_profile_to_budget() measures
+the condensed profile and, when it is over budget, trims sections in
+priority order (posts and extras first, work history last):
+
+  - text inside list items is shortened
+  - older list items are replaced by a one-line summary
+    ("Engineer at Acme (2015-2018); ...")
+  - long text fields are cut, and what is left is dropped entirely
+
+Identity fields (name, current title and company, headline, location) are
+never trimmed. Token counts use tiktoken when it is installed and the
+four-characters-per-token estimate otherwise.
+"""
+
+import os
+import json
+
+from profile_condenser import condense_profile, compact_json, estimate_tokens
+
+DEFAULT_PROMPT_TOKEN_BUDGET = 6000
+
+ESSENTIAL_FIELDS = {"name", "current_position_title", "current_company_name", "headline", "location"}
+
+# Higher priority sections are kept longer
+SECTION_PRIORITY = {
+    "work_experience": 90,
+    "education_background": 80,
+    "skills": 70,
+    "summary": 60,
+    "certifications": 40,
+    "languages": 30,
+    "honors": 20,
+    "posts": 10,
+    "activity": 10,
+}
+DEFAULT_SECTION_PRIORITY = 25
+
+MAP_REDUCE_MAX_LIST_ITEMS = 500
+
+SHORT_TEXT_CHARS = 160
+MIN_TEXT_CHARS = 80
+
+_encoder = None
+
+def count_tokens(text):
+    """
+    Token count for `text`: tiktoken's encoding (PROMPT_TOKENIZER_ENCODING,
+    default cl100k_base) when available, else the character estimate
+    """
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(os.getenv("PROMPT_TOKENIZER_ENCODING", "cl100k_base"))
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut `text` so it fits in `max_tokens`, marking the cut"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Start from the character estimate and shrink until it fits
+    chars = max(0, max_tokens * 4)
+    while chars > 0 and count_tokens(text[:chars]) > max_tokens - 2:
+        chars = int(chars * 0.9)
+    return text[:chars].rstrip() + " …[truncated]"
+
+def _item_summary(item):
+    """One-line description of a work history / education entry"""
+    if not isinstance(item, dict):
+        return str(item)[:MIN_TEXT_CHARS]
+    title = item.get("employee_title") or item.get("degree_name") or item.get("title")
+    org = item.get("employer_name") or item.get("institute_name") or item.get("company_name")
+    start = str(item.get("start_date") or "")[:4]
+    end = str(item.get("end_date") or "")[:4] or ("present" if start else "")
+    line = " at ".join(part for part in (title, org) if part) or compact_json(item)[:MIN_TEXT_CHARS]
+    return f"{line} ({start}-{end})" if start else line
+
+def _shorten_strings(value, max_chars):
+    if isinstance(value, dict):
+        return {k: _shorten_strings(v, max_chars) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shorten_strings(v, max_chars) for v in value]
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars].rstrip() + "…"
+    return value
+
+def _reductions(key, value):
+    """
+    Successively smaller versions of one section, ending with None (drop it).
+    List sections yield (kept items, summary of the rest) pairs.
+    """
+    if isinstance(value, list):
+        items = _shorten_strings(value, SHORT_TEXT_CHARS)
+        yield items, None
+        keep = len(items)
+        while keep > 1:
+            keep //= 2
+            yield items[:keep], "; ".join(_item_summary(item) for item in items[keep:])
+        yield [], "; ".join(_item_summary(item) for item in items)
+    elif isinstance(value, str):
+        length = len(value)
+        while length > MIN_TEXT_CHARS:
+            length //= 2
+            yield value[:length].rstrip() + "…", None
+    yield None, None
+
+def _section_tokens(key, value):
+    return count_tokens(compact_json({key: value})) if value not in (None, []) else 0
+
+def fit_profile_to_budget(person, budget_tokens=DEFAULT_PROMPT_TOKEN_BUDGET):
+    """
+    Condensed compact JSON for `person` that fits in `budget_tokens` where
+    possible, plus stats: original_tokens, condensed_tokens (after fitting),
+    budget, and truncated {section: [tokens_before, tokens_after]}
+    """
+    profile = condense_profile(person)
+    stats = {
+        "original_tokens": count_tokens(json.dumps(person, indent=2)),
+        "budget": budget_tokens,
+        "truncated": {},
+    }
+    text = compact_json(profile)
+    tokens = count_tokens(text)
+
+    sections = sorted(
+        (key for key in profile if key not in ESSENTIAL_FIELDS),
+        key=lambda key: SECTION_PRIORITY.get(key, DEFAULT_SECTION_PRIORITY),
+    )
+    for key in sections:
+        if tokens <= budget_tokens:
+            break
+        original = profile[key]
+        before = _section_tokens(key, original)
+        summary_key = f"earlier_{key}"
+        for reduced, summary in _reductions(key, original):
+            if reduced is None:
+                profile.pop(key, None)
+            else:
+                profile[key] = reduced
+            if summary:
+                profile[summary_key] = summary
+            else:
+                profile.pop(summary_key, None)
+            text = compact_json(profile)
+            tokens = count_tokens(text)
+            if tokens <= budget_tokens:
+                break
+        after = _section_tokens(key, profile.get(key)) + _section_tokens(summary_key, profile.get(summary_key))
+        stats["truncated"][key] = [before, after]
+
+    stats["condensed_tokens"] = tokens
+    return text, stats
+
+def format_budget_stats(stats):
+    """One-line summary of condensing and budget trimming"""
+    line = f"📦 Profile: {stats['original_tokens']:,} → {stats['condensed_tokens']:,} tokens (budget {stats['budget']:,})"
+    if stats["truncated"]:
+        line += " · trimmed " + ", ".join(
+            f"{key} {before:,}→{after:,}" for key, (before, after) in stats["truncated"].items()
+        )
+    return line
+
+def chunk_profile(person, chunk_tokens=1500):
+    """
+    Split a condensed profile for map-reduce analysis. Returns the identity
+    fields as compact JSON plus a list of (label, compact JSON) chunks of
+    roughly `chunk_tokens` at most: one per section, with long list sections
+    split into runs of consecutive items. Lists are packed from their oldest
+    end, so a newly added role only changes the first chunk of its section
+    and the other chunks (and their cached summaries) stay the same.
+    """
+    # Map-reduce exists for long histories, so lists are not capped here
+    profile = condense_profile(person, max_list_items=MAP_REDUCE_MAX_LIST_ITEMS)
+    header = compact_json({key: value for key, value in profile.items() if key in ESSENTIAL_FIELDS})
+    chunks = []
+    sections = sorted(
+        (key for key in profile if key not in ESSENTIAL_FIELDS),
+        key=lambda key: -SECTION_PRIORITY.get(key, DEFAULT_SECTION_PRIORITY),
+    )
+    for key in sections:
+        value = profile[key]
+        if not isinstance(value, list):
+            chunks.append((key, truncate_to_tokens(compact_json({key: value}), chunk_tokens)))
+            continue
+        groups = [group[::-1] for group in pack_items(value[::-1], chunk_tokens)][::-1]
+        # Every part keeps the bare section name as its label so adding a part
+        # doesn't change the other parts' prompts
+        for items in groups:
+            chunks.append((key, truncate_to_tokens(compact_json({key: items}), chunk_tokens)))
+    return header, chunks
+
+def pack_items(items, max_tokens):
+    """
+    Group consecutive items into lists whose compact JSON stays within
+    `max_tokens` (a single oversized item gets a group of its own)
+    """
+    groups, current, current_tokens = [], [], 0
+    for item in items:
+        text = item if isinstance(item, str) else compact_json(item)
+        tokens = count_tokens(text)
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups